@@ -7,29 +7,55 @@ Minimal KDE backup/restore helper using konsave + package/flatpak lists.
 No external Python deps; relies on shell tools: konsave, rpm/apt/pacman/zypper, flatpak.
 """
 import sys
+import atexit
+import os
 import json
+import stat
 import shutil
+import hashlib
+import io
 import tarfile
 import zipfile
 import subprocess
 import platform
 import re
+import zlib
 from pathlib import Path
+from dataclasses import dataclass, field
+from typing import NamedTuple
 from datetime import datetime
 import shlex
-import filecmp
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
 
 BACKUP_ROOT = Path.cwd() / "kde-backups"
 DEFAULT_PROFILE = "kde-profile"
+# Entries under BACKUP_ROOT that are not backups themselves
+NON_BACKUP_DIRS = {"archive", "scripts", "objects"}
 
 # --------------------- helpers ---------------------
 
-def run(cmd, check=True, capture_output=True, text=True):
-    return subprocess.run(cmd, check=check, capture_output=capture_output, text=text)
+def run(cmd, check=True, capture_output=True, text=True, env=None):
+    return subprocess.run(cmd, check=check, capture_output=capture_output, text=text, env=env)
 
 
+# Package tooling is looked up in one pass and memoized for the process; which() answers
+# from the same table instead of walking PATH again on every call.
+PROBED_TOOLS = ("dnf", "apt", "apt-get", "apt-mark", "apt-cache", "pacman", "zypper", "rpm",
+                "yay", "paru", "flatpak", "konsave", "zstd")
+
+
+@lru_cache(maxsize=None)
+def probe_tools() -> dict[str, bool]:
+    return {t: shutil.which(t) is not None for t in PROBED_TOOLS}
+
+
+@lru_cache(maxsize=None)
 def which(cmd: str) -> bool:
-    return shutil.which(cmd) is not None
+    tools = probe_tools()
+    return tools[cmd] if cmd in tools else shutil.which(cmd) is not None
 
 
 def ensure_dir(p: Path):
@@ -40,51 +66,951 @@ def timestamp() -> str:
     return datetime.now().strftime("%Y%m%d-%H%M%S")
 
 
+# --------------------- machine-readable output ---------------------
+
+class RecordStream:
+    """--json / --ndjson output of preview, dry-run, compare and verify.
+    Each record is written (and flushed) as soon as it is produced: one object per line
+    for ndjson, elements of a single top-level array for json. Nothing is accumulated."""
+
+    def __init__(self, fmt: str, out=None):
+        self.fmt = fmt
+        self.out = out or sys.stdout
+        self.count = 0
+        self.closed = False
+
+    def emit(self, command: str, kind: str, **fields):
+        line = json.dumps({"command": command, "type": kind, **fields}, ensure_ascii=False)
+        if self.fmt == "json":
+            line = ("[\n" if self.count == 0 else ",\n") + line
+        else:
+            line += "\n"
+        self.out.write(line)
+        self.out.flush()
+        self.count += 1
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.fmt == "json":
+            self.out.write("[]\n" if self.count == 0 else "\n]\n")
+            self.out.flush()
+
+
+RECORDS: RecordStream | None = None  # set by --json / --ndjson
+
+
+# --------------------- copy engine ---------------------
+
+COPY_JOBS = min(8, (os.cpu_count() or 2) * 2)  # set by --jobs
+
+
+class CopyEngine:
+    """Bounded thread pool for per-file copy work.
+    Many small files are dominated by per-file syscall latency, so copies run on
+    `jobs` workers. OSErrors are collected per file instead of being swallowed;
+    call wait() (or leave the with-block) before relying on the results."""
+
+    def __init__(self, jobs: int | None = None):
+        self.jobs = max(1, jobs or COPY_JOBS)
+        self._pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="copy")
+        # Bound queued work so walking a huge tree does not build an unbounded backlog
+        self._slots = threading.BoundedSemaphore(self.jobs * 4)
+        self._lock = threading.Lock()
+        self._futures = []
+        self.errors: list[tuple[Path, Path, OSError]] = []
+        self.done = 0
+        with _copy_stats_lock:
+            self._stats_start = dict(_copy_stats)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _run(self, fn, src: Path, dst: Path, on_success):
+        try:
+            fn(src, dst)
+        except OSError as e:
+            with self._lock:
+                self.errors.append((src, dst, e))
+            return
+        finally:
+            self._slots.release()
+        with self._lock:
+            self.done += 1
+        if on_success is not None:
+            on_success()
+
+    def submit(self, fn, src: Path, dst: Path, on_success=None):
+        """Schedule fn(src, dst); on_success() runs only if it did not raise OSError."""
+        self._slots.acquire()
+        self._futures.append(self._pool.submit(self._run, fn, src, dst, on_success))
+
+    def copy(self, src: Path, dst: Path, on_success=None):
+        self.submit(_copy_file, src, dst, on_success)
+
+    def wait(self):
+        """Block until all submitted work finished; re-raise unexpected (non-OSError) failures."""
+        futures, self._futures = self._futures, []
+        for f in futures:
+            f.result()
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def strategies(self) -> dict[str, int]:
+        """Files copied per strategy (reflink / copy_file_range / userspace) since this engine started."""
+        with _copy_stats_lock:
+            return {k: _copy_stats[k] - self._stats_start.get(k, 0) for k in COPY_STRATEGIES}
+
+    def report(self, label: str = "Dosya"):
+        for src, dst, e in self.errors:
+            print(f"[!] Kopyalanamadı: {src} -> {dst}: {e}")
+        if self.errors:
+            print(f"[!] {label}: {len(self.errors)} dosya kopyalanamadı ({self.done} başarılı).")
+        used = {k: v for k, v in self.strategies().items() if v}
+        if used:
+            print(f"[i] {label} kopyalama yöntemi: " + ", ".join(f"{k} {v}" for k, v in used.items()))
+
+
+FICLONE = 0x40049409  # ioctl(dst_fd, FICLONE, src_fd): share extents on btrfs/XFS
+COPY_STRATEGIES = ("reflink", "copy_file_range", "userspace")
+_copy_stats = {k: 0 for k in COPY_STRATEGIES}
+_copy_stats_lock = threading.Lock()
+
+
+def _count_strategy(name: str):
+    with _copy_stats_lock:
+        _copy_stats[name] += 1
+
+
+def _clone_file(src: Path, dst: Path, reflink_only: bool = False) -> str | None:
+    """Copy file data in the kernel: FICLONE reflink first, then os.copy_file_range
+    (unless reflink_only). Returns the strategy used, or None (dst left empty) if none works here."""
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        try:
+            import fcntl
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            return "reflink"
+        except (OSError, ImportError):
+            pass
+        if hasattr(os, "copy_file_range") and not reflink_only:
+            try:
+                size = os.fstat(fin.fileno()).st_size
+                copied = 0
+                while n := os.copy_file_range(fin.fileno(), fout.fileno(), 1 << 30):
+                    copied += n
+                # FUSE, some network filesystems and procfs-like files report EOF early
+                if copied >= size:
+                    return "copy_file_range"
+            except OSError:
+                # EXDEV/ENOSYS/EINVAL on older kernels or special files: start over in userspace
+                pass
+            fout.seek(0)
+            fout.truncate()
+    return None
+
+
+def _copy_file(src: Path, dst: Path):
+    ensure_dir(dst.parent)
+    strategy = _clone_file(src, dst)
+    if strategy is None:
+        shutil.copyfile(src, dst)
+        strategy = "userspace"
+    shutil.copystat(src, dst)
+    _count_strategy(strategy)
+
+
 # --------------------- sync helpers ---------------------
 
-def _copy_if_changed(src: Path, dst: Path):
-    """Copy file if destination missing or size/mtime differ."""
-    if not dst.exists():
-        ensure_dir(dst.parent)
-        shutil.copy2(src, dst)
-        return
+def _stat_unchanged(a: os.stat_result, b: os.stat_result) -> bool:
+    """Same size and same mtime (second resolution, copy2 keeps it) -> treat as unchanged."""
+    return a.st_size == b.st_size and int(a.st_mtime) == int(b.st_mtime)
+
+
+def _scan_files(root: Path):
+    """Yield os.DirEntry for every file under root using os.scandir (one pass, no re-stat).
+    Like rglob: directory symlinks are not descended into, file symlinks count as files.
+    DirEntry.stat() results are cached by the entry, so callers get stats for free."""
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            stack.append(e.path)
+                        elif e.is_file():
+                            yield e
+                    except OSError:
+                        pass
+        except OSError:
+            continue
+
+
+def _has_entries(d: Path) -> bool:
     try:
-        src_stat = src.stat()
-        dst_stat = dst.stat()
-        if src_stat.st_size != dst_stat.st_size or int(src_stat.st_mtime) != int(dst_stat.st_mtime):
-            ensure_dir(dst.parent)
-            shutil.copy2(src, dst)
+        with os.scandir(d) as it:
+            return next(it, None) is not None
     except OSError:
-        ensure_dir(dst.parent)
-        shutil.copy2(src, dst)
+        return False
 
 
-def _sync_tree(src_dir: Path, dst_dir: Path):
-    """One-way sync: copy new/changed files from src_dir to dst_dir and remove deleted ones in dst_dir."""
+def _remove_entry(e: os.DirEntry):
+    try:
+        if e.is_dir(follow_symlinks=False):
+            shutil.rmtree(e.path, ignore_errors=True)
+        else:
+            os.unlink(e.path)
+    except OSError:
+        pass
+
+
+def _scan_dir(d: Path | str) -> dict[str, os.DirEntry]:
+    try:
+        with os.scandir(d) as it:
+            return {e.name: e for e in it}
+    except OSError:
+        return {}
+
+
+def _sync_tree(src_dir: Path, dst_dir: Path, engine: CopyEngine, on_file=None):
+    """One-way sync: copy new/changed files from src_dir to dst_dir and remove deleted ones in dst_dir.
+    Source and destination are scanned together, one directory at a time, so copy, prune and
+    empty-directory cleanup happen in a single pass over each tree.
+    on_file(entry, target) is called for every source file once its destination is up to date."""
+    _sync_dir(str(src_dir), str(dst_dir), engine, on_file)
     ensure_dir(dst_dir)
-    desired: set[Path] = set()
-    for p in src_dir.rglob("*"):
-        if p.is_file():
-            rel = p.relative_to(src_dir)
-            dst = dst_dir / rel
-            _copy_if_changed(p, dst)
-            desired.add(dst)
-    # Remove extraneous files in dst_dir
-    for p in list(dst_dir.rglob("*")):
-        if p.is_file() and p not in desired:
+
+
+def _sync_dir(src: str, dst: str, engine: CopyEngine, on_file=None) -> bool:
+    """Sync one directory level and recurse. Returns True if dst keeps any file."""
+    src_entries = _scan_dir(src)
+    dst_entries = _scan_dir(dst)
+    kept = False
+    for name, e in src_entries.items():
+        d = dst_entries.get(name)
+        target = os.path.join(dst, name)
+        try:
+            if e.is_dir(follow_symlinks=False):
+                if d is not None and not d.is_dir(follow_symlinks=False):
+                    _remove_entry(d)
+                kept = _sync_dir(e.path, target, engine, on_file) or kept
+            elif e.is_file():
+                if d is not None and d.is_dir(follow_symlinks=False):
+                    _remove_entry(d)
+                    d = None
+                if d is None or not _stat_unchanged(e.stat(), d.stat()):
+                    done = (lambda e=e, t=target: on_file(e, t)) if on_file else None
+                    engine.submit(_copy_file, Path(e.path), Path(target), on_success=done)
+                elif on_file:
+                    on_file(e, target)
+                kept = True
+        except OSError:
+            pass
+    for name, d in dst_entries.items():
+        e = src_entries.get(name)
+        if e is None or not (e.is_dir(follow_symlinks=False) or e.is_file()):
+            _remove_entry(d)
+    if not kept and dst_entries:
+        # Nothing left below this directory (same as pruning empty dirs afterwards)
+        shutil.rmtree(dst, ignore_errors=True)
+    return kept
+
+
+# --------------------- quick backup stat index ---------------------
+
+STAT_INDEX_NAME = ".stat-index.json"
+STAT_INDEX_VERSION = 1
+
+
+class StatIndex:
+    """Persistent source-side stats for files mirrored into latest/.
+    Maps a path relative to latest/ to [size, mtime_ns, inode, blake2b-or-None, mode].
+    When a source file still matches its entry, the destination is not touched at all;
+    deletions are found by diffing the index instead of walking latest/.
+    Without a usable index (first run, corrupt file) the full-scan _sync_tree is used once."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.path = root / STAT_INDEX_NAME
+        self.old: dict[str, list] = {}
+        self.new: dict[str, list] = {}
+        self.seen: set[str] = set()
+        self.owned: list[str] = []  # prefixes whose unseen entries must be deleted
+        self.loaded = False
+        self.skipped = 0
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(read_text(self.path))
+            if data.get("version") == STAT_INDEX_VERSION:
+                self.old = data.get("entries") or {}
+                self.loaded = True
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _record(self, key: str, st: os.stat_result, digest: str | None):
+        with self._lock:
+            self.new[key] = [st.st_size, st.st_mtime_ns, st.st_ino, digest, stat.S_IMODE(st.st_mode)]
+
+    def _copy(self, src: Path, key: str, st: os.stat_result):
+        def work(s: Path, d: Path):
+            ensure_dir(d.parent)
+            self._record(key, st, _copy_hashing(s, d))
+        return work
+
+    def sync_file(self, src: Path, key: str, engine: CopyEngine, st: os.stat_result | None = None):
+        """Mirror one file to latest/<key> if it changed since the last run."""
+        try:
+            st = st or src.stat()
+        except OSError:
+            return
+        with self._lock:
+            self.seen.add(key)
+        entry = self.old.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns and entry[2] == st.st_ino:
+            self._record(key, st, entry[3])
+            self.skipped += 1
+            return
+        dst = self.root / key
+        if entry is None and not self.loaded:
+            # No index yet: fall back to comparing with the existing copy once
+            try:
+                if _stat_unchanged(st, dst.stat()):
+                    self._record(key, st, None)
+                    return
+            except OSError:
+                pass
+        engine.submit(self._copy(src, key, st), src, dst)
+
+    def sync_tree(self, src_dir: Path, key_prefix: str, engine: CopyEngine):
+        """Mirror a directory to latest/<key_prefix>, deleting files that vanished from it."""
+        self.owned.append(key_prefix)
+        if not self.loaded:
+            def on_file(e: os.DirEntry, target: str):
+                key = Path(target).relative_to(self.root).as_posix()
+                with self._lock:
+                    self.seen.add(key)
+                self._record(key, e.stat(), None)
+            _sync_tree(src_dir, self.root / key_prefix, engine, on_file=on_file)
+            return
+        for e in _scan_files(src_dir):
+            try:
+                st = e.stat()
+            except OSError:
+                continue
+            key = f"{key_prefix}/{Path(e.path).relative_to(src_dir).as_posix()}"
+            self.sync_file(Path(e.path), key, engine, st)
+
+    def own(self, key_prefix: str):
+        """Files under key_prefix that were not synced in this run are deleted by finish()."""
+        self.owned.append(key_prefix)
+
+    def drop(self, key_prefix: str):
+        """Remove latest/<key_prefix> entirely (source target disappeared)."""
+        shutil.rmtree(self.root / key_prefix, ignore_errors=True)
+        self.old = {k: v for k, v in self.old.items() if not _under(k, key_prefix)}
+
+    def _delete(self, key: str, stop: Path):
+        p = self.root / key
+        try:
+            p.unlink()
+        except OSError:
+            return
+        parent = p.parent
+        while parent != stop and parent != self.root:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    def finish(self):
+        """Apply deletions, carry over entries of targets not synced this run and save."""
+        for prefix in self.owned:
+            stop = self.root / prefix
+            if self.loaded:
+                stale = [k for k in self.old if _under(k, prefix) and k not in self.seen]
+            else:
+                root = self.root / prefix
+                stale = [Path(e.path).relative_to(self.root).as_posix() for e in _scan_files(root)] if root.is_dir() else []
+                stale = [k for k in stale if k not in self.seen]
+            for key in stale:
+                self._delete(key, stop)
+        for key, entry in self.old.items():
+            if key not in self.seen and not any(_under(key, p) for p in self.owned):
+                self.new.setdefault(key, entry)
+        self._write_manifest()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        write_text(tmp, json.dumps({"version": STAT_INDEX_VERSION, "entries": self.new}, separators=(",", ":")))
+        os.replace(tmp, self.path)
+
+
+    def _write_manifest(self):
+        """latest/manifest.jsonl from the index. Files that were not copied through the hashing
+        path (first run, entries from older versions) are hashed once here; the digest is kept
+        in the index so later runs never read them again."""
+        def fill(key: str):
+            entry = self.new[key]
+            try:
+                if entry[3] is None:
+                    entry[3] = _hash_file(self.root / key)
+                if len(entry) < 5:
+                    entry.append(stat.S_IMODE((self.root / key).stat().st_mode))
+            except OSError:
+                pass
+        todo = [k for k, e in self.new.items() if e[3] is None or len(e) < 5]
+        if todo:
+            with ThreadPoolExecutor(max_workers=COPY_JOBS) as pool:
+                list(pool.map(fill, todo))
+        write_manifest(self.root, [
+            {"path": k, "hash": e[3], "size": e[0], "mtime_ns": e[1], "mode": e[4] if len(e) > 4 else None}
+            for k, e in self.new.items()
+        ])
+
+
+def _under(key: str, prefix: str) -> bool:
+    return key == prefix or key.startswith(prefix + "/")
+
+
+# --------------------- change journal (inotify) ---------------------
+
+JOURNAL_NAME = ".change-journal"
+JOURNAL_RESCAN = "*"  # journal line meaning "changes were missed, walk everything"
+WATCH_PID_NAME = ".watch.pid"
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+# IN_MODIFY as well as IN_CLOSE_WRITE: browser SQLite databases are written through descriptors
+# that stay open, so they never close-write; bursts are coalesced per batch in Watcher.run
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+
+def _quick_targets() -> list[tuple[Path, str]]:
+    """All quick backup targets with their kind: config, data, important, browser, file."""
+    return ([(p, "config") for p in EXTRA_CONFIG_FILES] + [(p, "data") for p in EXTRA_DATA_DIRS]
+            + [(p, "important") for p in IMPORTANT_DIRS] + [(p, "browser") for p in BROWSER_DIRS]
+            + [(p, "file") for p in HOME_FILES])
+
+
+def _match_target(rel: str) -> tuple[Path, str] | None:
+    """Map a path relative to $HOME to the quick backup target that covers it."""
+    for target, kind in _quick_targets():
+        t = target.as_posix()
+        if kind in {"config", "file"} and rel == t:
+            return target, kind
+        if kind not in {"config", "file"} and _under(rel, t):
+            return target, kind
+    return None
+
+
+class ChangeJournal:
+    """Changed paths (relative to $HOME) recorded by `watch`, consumed by quick backup.
+    Writers and the reader serialize on a separate lock file; the reader moves the journal
+    aside and deletes it only after a successful sync, so a crash never loses entries."""
+
+    def __init__(self, root: Path):
+        self.path = root / JOURNAL_NAME
+        self.processing = root / (JOURNAL_NAME + ".processing")
+        self.lock_path = root / (JOURNAL_NAME + ".lock")
+        self.pid_path = root / WATCH_PID_NAME
+
+    def _locked(self):
+        import fcntl
+        f = open(self.lock_path, "a")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return f  # closing the file releases the lock
+
+    def append(self, paths):
+        lock = self._locked()
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for p in paths:
+                    f.write(p + "\n")
+        finally:
+            lock.close()
+
+    def watcher_complete(self) -> bool:
+        """True if a watcher is alive and has watches on every existing target."""
+        try:
+            info = json.loads(read_text(self.pid_path))
+            os.kill(int(info["pid"]), 0)
+            return bool(info.get("complete"))
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def take(self) -> set[str] | None:
+        """Return journaled paths (empty set = nothing changed) or None if a full rescan is needed."""
+        lock = self._locked()
+        try:
+            if self.path.exists():
+                with open(self.processing, "a", encoding="utf-8") as out:
+                    out.write(read_text(self.path))
+                self.path.unlink()
+        finally:
+            lock.close()
+        if not self.processing.exists():
+            return set()
+        lines = {x for x in read_text(self.processing).splitlines() if x}
+        return None if JOURNAL_RESCAN in lines else lines
+
+    def commit(self):
+        """Forget the entries returned by take() once they are synced."""
+        try:
+            self.processing.unlink()
+        except OSError:
+            pass
+
+
+class _Inotify:
+    """Minimal ctypes binding for inotify(7)."""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._ctypes = ctypes
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+    def add(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = self._ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read(self):
+        """Yield (wd, mask, name) for the next batch of events (blocks)."""
+        import struct
+        buf = os.read(self.fd, 256 * 1024)
+        off = 0
+        while off + 16 <= len(buf):
+            wd, mask, _cookie, length = struct.unpack_from("iIII", buf, off)
+            name = buf[off + 16:off + 16 + length].split(b"\0", 1)[0]
+            off += 16 + length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher:
+    """Registers inotify watches on every quick backup target and journals changed paths."""
+
+    def __init__(self, home: Path, journal: ChangeJournal):
+        self.home = home
+        self.journal = journal
+        self.ino = _Inotify()
+        self.dirs: dict[int, str] = {}  # wd -> directory path relative to $HOME ("" = $HOME)
+        self.complete = True
+        self.reported_complete: bool | None = None  # what .watch.pid currently says
+
+    def _add(self, rel: str) -> bool:
+        try:
+            wd = self.ino.add(str(self.home / rel) if rel else str(self.home), WATCH_MASK)
+        except OSError as e:
+            if e.errno == 28:  # ENOSPC: fs.inotify.max_user_watches exhausted
+                self.complete = False
+                print(f"[!] inotify izleme sınırı doldu ({rel}); quick backup tam taramaya düşecek.")
+            return False
+        self.dirs[wd] = rel
+        return True
+
+    def _add_tree(self, rel: str):
+        if not self._add(rel):
+            return
+        stack = [str(self.home / rel)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for e in it:
+                        if e.is_dir(follow_symlinks=False):
+                            sub = Path(e.path).relative_to(self.home).as_posix()
+                            if self._add(sub):
+                                stack.append(e.path)
+            except OSError:
+                continue
+
+    def _nearest_existing(self, rel: Path) -> str:
+        p = rel
+        while p.as_posix() not in {".", ""} and not (self.home / p).is_dir():
+            p = p.parent
+        return "" if p.as_posix() == "." else p.as_posix()
+
+    def register(self):
+        """Watch directory targets recursively and the parent (or nearest existing ancestor) of
+        every target, so targets that are created or replaced later are noticed too."""
+        for target, kind in _quick_targets():
+            if kind not in {"config", "file"} and (self.home / target).is_dir():
+                self._add_tree(target.as_posix())
+            self._add(self._nearest_existing(target.parent))
+
+    def _relevant(self, rel: str) -> bool:
+        for target, kind in _quick_targets():
+            t = target.as_posix()
+            if rel == t or (kind not in {"config", "file"} and _under(rel, t)):
+                return True
+        return False
+
+    def _handle(self, wd: int, mask: int, name: str, out: set[str]):
+        if mask & IN_Q_OVERFLOW:
+            out.add(JOURNAL_RESCAN)
+            return
+        if mask & IN_IGNORED:
+            self.dirs.pop(wd, None)
+            return
+        base = self.dirs.get(wd)
+        if base is None or not name:
+            return
+        rel = f"{base}/{name}" if base else name
+        is_dir = bool(mask & IN_ISDIR)
+        if self._relevant(rel):
+            out.add(rel)
+            if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(rel)
+        elif is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+            # An ancestor of a missing target appeared: move watches closer to the targets
+            if any(_under(t.as_posix(), rel) for t, _ in _quick_targets()):
+                self.register()
+                out.add(rel)
+
+    def _write_pid(self):
+        write_text(self.journal.pid_path, json.dumps({"pid": os.getpid(), "complete": self.complete,
+                                                      "started": self.started}))
+        self.reported_complete = self.complete
+
+    def run(self):
+        import select
+        # Changes made before the watcher started are unknown
+        self.journal.append([JOURNAL_RESCAN])
+        self.started = timestamp()
+        self.register()
+        self._write_pid()
+        print(f"[i] {len(self.dirs)} dizin izleniyor; günlük: {self.journal.path}")
+        try:
+            while True:
+                batch: set[str] = set()
+                for ev in self.ino.read():
+                    self._handle(*ev, batch)
+                # Coalesce bursts (e.g. a browser writing many files) into one journal write
+                while select.select([self.ino.fd], [], [], 0.5)[0] and len(batch) < 10000:
+                    for ev in self.ino.read():
+                        self._handle(*ev, batch)
+                if self.reported_complete and not self.complete:
+                    # A directory created after startup could not be watched (ENOSPC): its
+                    # changes are missed from now on, so quick backups must walk everything
+                    batch.add(JOURNAL_RESCAN)
+                    self._write_pid()
+                if batch:
+                    self.journal.append(sorted(batch))
+        finally:
             try:
-                p.unlink()
+                self.journal.pid_path.unlink()
             except OSError:
                 pass
-    # Clean up empty dirs
-    for d in sorted((x for x in dst_dir.rglob("*") if x.is_dir()), reverse=True):
+            self.ino.close()
+
+
+def do_watch():
+    """Long-running change recorder for near-instant quick backups (Linux inotify)."""
+    latest_dir = BACKUP_ROOT / "latest"
+    ensure_dir(latest_dir)
+    journal = ChangeJournal(latest_dir)
+    if journal.watcher_complete():
+        print("[!] Zaten çalışan bir watch süreci var.")
+        return
+    try:
+        watcher = Watcher(Path.home(), journal)
+    except (OSError, AttributeError) as e:
+        print(f"[!] inotify kullanılamıyor: {e}")
+        return
+    import signal
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    watcher.run()
+
+
+# --------------------- snapshot store ---------------------
+
+OBJECTS_DIRNAME = "objects"
+MANIFEST_NAME = "manifest.jsonl"
+SNAPSHOT_MODES = ("objects", "link", "copy")
+SNAPSHOT_MODE = "objects"  # set by --snapshot-mode
+HASH_CHUNK = 1024 * 1024
+BLOB_MODE = 0o444  # blobs are shared by every snapshot that links them; keep them read-only
+OBJECTS_LOCK_NAME = ".lock"
+
+
+def _new_hasher():
+    return hashlib.blake2b(digest_size=32)
+
+
+def _hash_file(path: Path) -> str:
+    h = _new_hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _copy_hashing(src: Path, dst: Path) -> str:
+    """Copy src to dst (with metadata) and return the BLAKE2b digest of what was written.
+    Each file is read once: a reflink copies no data and dst is hashed afterwards; otherwise
+    the copy goes through userspace and is hashed in the same pass (copy_file_range would
+    read the data in the kernel and force a second read just for the hash)."""
+    strategy = _clone_file(src, dst, reflink_only=True)
+    if strategy is not None:
+        digest = _hash_file(dst)
+    else:
+        strategy = "userspace"
+        h = _new_hasher()
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            for chunk in iter(lambda: fin.read(HASH_CHUNK), b""):
+                h.update(chunk)
+                fout.write(chunk)
+        digest = h.hexdigest()
+    shutil.copystat(src, dst)
+    _count_strategy(strategy)
+    return digest
+
+
+def _manifest_entry(path: str, digest: str | None, st: os.stat_result) -> dict:
+    """One manifest.jsonl line: path relative to the backup dir plus the stats of the source
+    file and the BLAKE2b digest of the stored copy."""
+    return {"path": path, "hash": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "mode": stat.S_IMODE(st.st_mode)}
+
+
+def write_manifest(backup_dir: Path, entries: list[dict]):
+    tmp = backup_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for e in sorted(entries, key=lambda x: x["path"]):
+            f.write(json.dumps(e, ensure_ascii=False) + "\n")
+    os.replace(tmp, backup_dir / MANIFEST_NAME)
+
+
+def load_manifest(backup_dir: Path) -> dict[str, dict]:
+    """path -> manifest entry; empty when the backup has no (readable) manifest."""
+    entries: dict[str, dict] = {}
+    try:
+        with open(backup_dir / MANIFEST_NAME, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                    entries[e["path"]] = e
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def _restore_file(src: Path, dst: Path, entry: dict | None = None):
+    """Copy a stored file back into place. mtime and mode come from its manifest entry:
+    in the object store every snapshot of the same content shares one inode, so the
+    stored file's own metadata belongs to whichever source was stored first."""
+    _copy_file(src, dst)
+    if entry is None:
+        return
+    if entry.get("mode") is not None:
+        os.chmod(dst, entry["mode"])
+    if entry.get("mtime_ns") is not None:
+        os.utime(dst, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+
+
+class ObjectStore:
+    """Content-addressed blob store shared by all full backups.
+    Blobs live at objects/<2 hex>/<digest>; snapshot trees hardlink to them so a file
+    that did not change between backups occupies disk space only once. Blobs are read-only
+    and their mtime/mode are meaningless; the per-file values live in manifest.jsonl."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def lock(self, exclusive: bool = False):
+        """flock on objects/.lock: writers hold it shared from the first put() until every blob
+        is linked, prune() takes it exclusively. Returns the open file (closing it releases
+        the lock), or None if an exclusive lock is not available right now."""
+        import fcntl
+        ensure_dir(self.root)
+        f = open(self.root / OBJECTS_LOCK_NAME, "a")
+        try:
+            fcntl.flock(f, (fcntl.LOCK_EX | fcntl.LOCK_NB) if exclusive else fcntl.LOCK_SH)
+        except OSError:
+            f.close()
+            return None
+        return f
+
+    def put(self, src: Path, known: str | None = None) -> str:
+        """Store src if its content is not present yet; return its digest.
+        `known` is the digest of an unchanged file from the previous manifest: if that blob
+        exists, src is not read at all. Otherwise src is copied and hashed in one pass."""
+        if known and self.blob_path(known).exists():
+            return known
+        ensure_dir(self.root)
+        tmp = self.root / f".tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            digest = _copy_hashing(src, tmp)
+            os.chmod(tmp, BLOB_MODE)
+            blob = self.blob_path(digest)
+            ensure_dir(blob.parent)
+            try:
+                os.link(tmp, blob)  # never replace a blob another worker already published
+            except FileExistsError:
+                pass
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return digest
+
+    def materialize(self, digest: str, dst: Path, st: os.stat_result):
+        """Place blob at dst as a hardlink (a copy with the source's mode/mtime if linking fails)."""
+        blob = self.blob_path(digest)
+        ensure_dir(dst.parent)
+        if dst.exists() or dst.is_symlink():
+            dst.unlink()
+        try:
+            os.link(blob, dst)
+            return
+        except OSError:
+            pass
+        _copy_file(blob, dst)
+        os.chmod(dst, stat.S_IMODE(st.st_mode))
+        os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    def prune(self) -> int:
+        """Delete blobs no snapshot links to any more (link count 1). Returns count removed.
+        Skipped while a backup is writing: its fresh blobs are not linked yet."""
+        removed = 0
+        if not self.root.exists():
+            return 0
+        lock = self.lock(exclusive=True)
+        if lock is None:
+            print("[i] Başka bir yedek nesne deposuna yazıyor; objects/ temizliği atlandı.")
+            return 0
         try:
-            next(d.rglob("*")).__class__  # any content?
-        except StopIteration:
+            removed = self._prune_unlinked()
+        finally:
+            lock.close()
+        return removed
+
+    def _prune_unlinked(self) -> int:
+        removed = 0
+        for sub in self.root.iterdir():
+            if not sub.is_dir():
+                continue
+            for blob in sub.iterdir():
+                try:
+                    if blob.stat().st_nlink <= 1:
+                        blob.unlink()
+                        removed += 1
+                except OSError:
+                    pass
             try:
-                d.rmdir()
+                sub.rmdir()
             except OSError:
                 pass
+        return removed
+
+
+def _previous_backup_dir(exclude: Path | None = None) -> Path | None:
+    """Newest full backup (by timestamp name) that has extra-* trees, other than `exclude`."""
+    if not BACKUP_ROOT.exists():
+        return None
+    cands = sorted(p for p in BACKUP_ROOT.iterdir()
+                   if p.is_dir() and p.name != "latest" and p.name not in NON_BACKUP_DIRS
+                   and p != exclude
+                   and ((p / "extra-data").is_dir() or (p / "extra-config").is_dir()))
+    return cands[-1] if cands else None
+
+
+class SnapshotWriter:
+    """Writes files into a full backup directory according to the snapshot mode
+    and records one manifest line per stored file, hashed while it is written.
+    - objects: store in the shared object store and hardlink (see ObjectStore); files whose
+      size/mtime_ns match the previous manifest reuse its digest and are not read
+    - link: hardlink to the previous backup's copy when size/mtime/mode match (rsync --link-dest);
+      the hash of a linked file comes from the previous manifest
+    - copy: plain copy2"""
+
+    def __init__(self, backup_dir: Path, mode: str | None = None):
+        self.backup_dir = backup_dir
+        self.mode = mode or SNAPSHOT_MODE
+        self.store = ObjectStore(BACKUP_ROOT / OBJECTS_DIRNAME) if self.mode == "objects" else None
+        self._store_lock = self.store.lock() if self.store is not None else None
+        self.link_dest = _previous_backup_dir(exclude=backup_dir) if self.mode in ("objects", "link") else None
+        self.link_manifest = load_manifest(self.link_dest) if self.link_dest is not None else {}
+        self.entries: list[dict] = []
+        self.linked = 0
+        self._lock = threading.Lock()
+
+    def _link_previous(self, src: Path, dst: Path) -> bool:
+        prev = self.link_dest / dst.relative_to(self.backup_dir)
+        try:
+            src_stat = src.stat()
+            prev_stat = prev.stat()
+            if not _stat_unchanged(src_stat, prev_stat) or src_stat.st_mode != prev_stat.st_mode:
+                return False
+            if dst.exists() or dst.is_symlink():
+                dst.unlink()
+            os.link(prev, dst)
+        except OSError:
+            return False
+        with self._lock:
+            self.linked += 1
+        return True
+
+    def add(self, src: Path, dst: Path):
+        ensure_dir(dst.parent)
+        st = src.stat()
+        rel = dst.relative_to(self.backup_dir).as_posix()
+        if self.store is not None:
+            # Same size and mtime_ns as in the previous manifest: reuse its digest (like StatIndex)
+            prev = self.link_manifest.get(rel)
+            known = (prev["hash"] if prev and prev.get("size") == st.st_size
+                     and prev.get("mtime_ns") == st.st_mtime_ns else None)
+            digest = self.store.put(src, known)
+            self.store.materialize(digest, dst, st)
+        elif self.link_dest is not None and self._link_previous(src, dst):
+            prev = self.link_manifest.get(rel)
+            digest = prev["hash"] if prev and prev.get("hash") and prev.get("size") == st.st_size else _hash_file(dst)
+        else:
+            digest = _copy_hashing(src, dst)
+        with self._lock:
+            self.entries.append(_manifest_entry(rel, digest, st))
+
+    def write_manifest(self):
+        """Finish the snapshot: write manifest.jsonl and let prune() run again."""
+        if self._store_lock is not None:
+            self._store_lock.close()
+            self._store_lock = None
+        if not self.entries:
+            return
+        write_manifest(self.backup_dir, self.entries)
 
 
 def detect_pkg_manager() -> str:
@@ -118,7 +1044,141 @@ def detect_package_managers() -> dict[str, str]:
         pm_info["rpm"] = "rpm"
     return pm_info
 
+# --------------------- native package database readers ---------------------
+# In-process readers for the package databases, so listing does not spawn rpm/pacman/dpkg
+# (or a login shell). Each returns None when the database is absent or unreadable and the
+# caller falls back to the package manager CLI. `root` allows reading fixture trees.
+
+PACMAN_LOCAL_DB = "var/lib/pacman/local"
+PACMAN_LOG = "var/log/pacman.log"
+DPKG_STATUS = "var/lib/dpkg/status"
+APT_EXTENDED_STATES = "var/lib/apt/extended_states"
+RPMDB_SQLITE_PATHS = ("usr/lib/sysimage/rpm/rpmdb.sqlite", "var/lib/rpm/rpmdb.sqlite")
+
+
+def _parse_pacman_desc(text: str) -> dict[str, list[str]]:
+    fields: dict[str, list[str]] = {}
+    cur = None
+    for line in text.splitlines():
+        if line.startswith("%") and line.endswith("%") and len(line) > 2:
+            cur = line[1:-1]
+            fields[cur] = []
+        elif line and cur is not None:
+            fields[cur].append(line)
+    return fields
+
+
+def read_pacman_explicit(root: Path = Path("/")) -> list[str] | None:
+    """Explicitly installed packages from the pacman local db (same set as `pacman -Qqe`)."""
+    db = root / PACMAN_LOCAL_DB
+    if not db.is_dir():
+        return None
+    pkgs: set[str] = set()
+    try:
+        for entry in db.iterdir():
+            desc = entry / "desc"
+            if not desc.is_file():
+                continue
+            fields = _parse_pacman_desc(desc.read_text(encoding="utf-8", errors="replace"))
+            name = (fields.get("NAME") or [""])[0]
+            # %REASON% is omitted for explicit installs; 1 means installed as a dependency
+            if name and (fields.get("REASON") or ["0"])[0] == "0":
+                pkgs.add(name)
+    except OSError:
+        return None
+    return sorted(pkgs)
+
+
+def _parse_deb822(text: str):
+    """Yield one dict per stanza of a dpkg status / apt extended_states style file."""
+    stanza: dict[str, str] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            if stanza:
+                yield stanza
+                stanza = {}
+        elif not line[0].isspace() and ":" in line:
+            key, _, value = line.partition(":")
+            stanza[key] = value.strip()
+    if stanza:
+        yield stanza
+
+
+def read_dpkg_manual(root: Path = Path("/")) -> list[str] | None:
+    """Manually installed packages (`apt-mark showmanual`): installed per dpkg status and
+    not flagged Auto-Installed in apt's extended_states. Without extended_states all
+    installed packages are returned, like the `dpkg -l` fallback."""
+    status = root / DPKG_STATUS
+    if not status.is_file():
+        return None
+    try:
+        installed = [(st["Package"], st.get("Architecture", ""))
+                     for st in _parse_deb822(status.read_text(encoding="utf-8", errors="replace"))
+                     if "Package" in st and st.get("Status", "").endswith(" installed")]
+        auto: set[tuple[str, str]] = set()
+        ext = root / APT_EXTENDED_STATES
+        if ext.is_file():
+            for st in _parse_deb822(ext.read_text(encoding="utf-8", errors="replace")):
+                if st.get("Auto-Installed") == "1" and "Package" in st:
+                    auto.add((st["Package"], st.get("Architecture", "")))
+    except OSError:
+        return None
+    # apt records arch:all packages under the native arch and apt-mark prints
+    # foreign-architecture packages as name:arch
+    archs = [a for _, a in installed if a and a != "all"]
+    native = max(set(archs), key=archs.count) if archs else ""
+    pkgs = set()
+    for name, arch in installed:
+        arch = native if arch in {"", "all"} else arch
+        if (name, arch) in auto or (name, "") in auto:
+            continue
+        pkgs.add(name if arch == native else f"{name}:{arch}")
+    return sorted(pkgs)
+
+
+def read_rpmdb_names(root: Path = Path("/")) -> list[str] | None:
+    """Package names from the sqlite rpm database (Name index), like `rpm -qa --qf %{NAME}`."""
+    import sqlite3
+    for rel in RPMDB_SQLITE_PATHS:
+        db = root / rel
+        if not db.is_file():
+            continue
+        # mode=ro needs the WAL -shm file; immutable=1 works without write access to the db dir
+        for opts in ("mode=ro", "immutable=1"):
+            try:
+                con = sqlite3.connect(f"file:{db}?{opts}", uri=True)
+                try:
+                    rows = con.execute("SELECT key FROM Name").fetchall()
+                finally:
+                    con.close()
+            except sqlite3.Error:
+                continue
+            names = set()
+            for (key,) in rows:
+                if isinstance(key, bytes):
+                    key = key.decode("utf-8", "replace")
+                if key:
+                    names.add(key)
+            return sorted(names)
+    return None
+
+
+NATIVE_PKG_READERS = {
+    "dnf": read_rpmdb_names,
+    "rpm": read_rpmdb_names,
+    "zypper": read_rpmdb_names,
+    "apt": read_dpkg_manual,
+    "pacman": read_pacman_explicit,
+}
+
+
 def list_installed_packages(pm: str) -> list[str]:
+    reader = NATIVE_PKG_READERS.get(pm)
+    if reader is not None:
+        pkgs = reader()
+        if pkgs is not None:
+            return pkgs
+    # Fallback: ask the package manager
     try:
         if pm == "dnf":
             # Use rpm to get clean names
@@ -151,59 +1211,338 @@ def list_installed_packages(pm: str) -> list[str]:
         pass
     return []
 
+def aur_helper() -> str | None:
+    for helper in ("yay", "paru"):
+        if which(helper):
+            return helper
+    return None
+
+
 def list_installed_aur_packages() -> list[str]:
     """List packages installed via AUR (if applicable)."""
-    if not which("yay") and not which("paru"):
+    helper = aur_helper()
+    if not helper:
         return []
 
     try:
-        aur_helper = "yay" if which("yay") else "paru"
-        res = run([aur_helper, "-Qm"])  # List AUR packages only
+        res = run([helper, "-Qm"])  # List AUR packages only
         return sorted(set(line.split()[0] for line in res.stdout.splitlines() if line.strip()))
     except subprocess.CalledProcessError:
         return []
 
+
+# --------------------- flatpak installations ---------------------
+# Installed apps are read straight from the installation directories instead of
+# `flatpak list`, which has to open the OSTree repos:
+#   <installation>/app/<id>/<arch>/<branch>/active -> <commit>/deploy
+# `deploy` is a GVariant of type (ssasta{sv}): origin, commit, subpaths, installed size
+# (big-endian uint64) and metadata.
+
+@dataclass
+class FlatpakApp:
+    ref: str                  # <id>/<arch>/<branch>, same as `flatpak list --columns=ref`
+    origin: str = ""          # remote the app was installed from
+    installed_size: int = 0   # bytes
+    installation: str = ""    # user | system
+
+    def line(self) -> str:
+        """flatpaks.txt line: the ref, followed by a tab and the remote when known."""
+        return f"{self.ref}\t{self.origin}" if self.origin else self.ref
+
+
+def _flatpak_installations() -> list[tuple[str, Path]]:
+    user = os.environ.get("FLATPAK_USER_DIR") or str(Path.home() / ".local/share/flatpak")
+    system = os.environ.get("FLATPAK_SYSTEM_DIR") or "/var/lib/flatpak"
+    return [("user", Path(user)), ("system", Path(system))]
+
+
+def _parse_flatpak_deploy(data: bytes) -> tuple[str, int]:
+    """(origin, installed size) from a flatpak `deploy` file."""
+    n = len(data)
+    osz = 1 if n <= 0xFF else 2 if n <= 0xFFFF else 4 if n <= 0xFFFFFFFF else 8
+    # Framing offsets of the three variable-size members (s, s, as) sit at the end, reversed
+    ends = [int.from_bytes(data[n - (i + 1) * osz:n - i * osz], "little") for i in range(3)]
+    if n < 3 * osz or not (0 < ends[0] <= ends[1] <= ends[2] <= n - 3 * osz):
+        return data.split(b"\0", 1)[0].decode("utf-8", "replace"), 0
+    origin = data[:ends[0]].rstrip(b"\0").decode("utf-8", "replace")
+    start = (ends[2] + 7) & ~7
+    size = int.from_bytes(data[start:start + 8], "big") if start + 8 <= n - 3 * osz else 0
+    return origin, size
+
+
+def read_flatpak_apps(installations: list[tuple[str, Path]] | None = None) -> list[FlatpakApp] | None:
+    """Deployed apps of the given (name, path) installations; None when none of them exist."""
+    apps: list[FlatpakApp] = []
+    found = False
+    for name, inst in installations or _flatpak_installations():
+        app_root = inst / "app"
+        if not app_root.is_dir():
+            continue
+        found = True
+        try:
+            for branch_dir in sorted(app_root.glob("*/*/*")):
+                deploy = branch_dir / "active" / "deploy"
+                try:
+                    origin, size = _parse_flatpak_deploy(deploy.read_bytes())
+                except OSError:
+                    continue  # not deployed (no active commit)
+                ref = branch_dir.relative_to(app_root).as_posix()
+                apps.append(FlatpakApp(ref, origin, size, name))
+        except OSError:
+            return None
+    return apps if found else None
+
+
+def list_flatpak_apps() -> list[FlatpakApp]:
+    apps = read_flatpak_apps()
+    if apps is not None:
+        return apps
+    # Fallback: ask flatpak
+    if not which("flatpak"):
+        return []
+    try:
+        res = run(["flatpak", "list", "--app", "--columns=ref,origin,installation"])
+    except subprocess.CalledProcessError:
+        return []
+    apps = []
+    for line in res.stdout.splitlines():
+        ref, origin, installation = (line.strip().split("\t") + ["", ""])[:3]
+        if ref:
+            apps.append(FlatpakApp(ref, origin, 0, installation))
+    return apps
+
+
+def flatpak_lines(apps: list[FlatpakApp]) -> list[str]:
+    """flatpaks.txt lines, one per ref (the user installation wins over the system one)."""
+    by_ref: dict[str, FlatpakApp] = {}
+    for app in apps:
+        by_ref.setdefault(app.ref, app)
+    return [by_ref[r].line() for r in sorted(by_ref)]
+
+
+def list_flatpaks() -> list[str]:
+    return flatpak_lines(list_flatpak_apps())
+
+
+def parse_flatpak_lines(lines) -> dict[str, str]:
+    """flatpaks.txt lines ("ref" or "ref<TAB>remote") -> {ref: remote or ""}."""
+    refs: dict[str, str] = {}
+    for line in lines:
+        ref, _, origin = line.strip().partition("\t")
+        if ref:
+            refs.setdefault(ref, origin.strip())
+    return refs
+
+
+def read_flatpak_list(path: Path) -> dict[str, str]:
+    return parse_flatpak_lines(_list_lines(path))
+
+
+def flatpak_install_commands(refs: dict[str, str], limit: int | None = None) -> list[str]:
+    """One `flatpak install` command per remote; refs without a recorded remote go into a
+    command without one, which lets flatpak pick the remote."""
+    groups: dict[str, list[str]] = {}
+    for ref in sorted(refs):
+        groups.setdefault(refs[ref], []).append(ref)
+    cmds = []
+    for origin in sorted(groups):
+        items = groups[origin]
+        shown = items[:limit] if limit else items
+        cmd = "flatpak install -y --noninteractive " + (shlex.quote(origin) + " " if origin else "")
+        cmd += " ".join(shlex.quote(x) for x in shown)
+        if len(shown) < len(items):
+            cmd += " ..."
+        cmds.append(cmd)
+    return cmds
+
+
+@dataclass
+class PackageInventory:
+    """Installed packages of this machine, enumerated once per run.
+    packages.txt, flatpaks.txt, system-packages.json and <type>-packages.txt are all rendered
+    from the same object, so each package manager is queried a single time."""
+    pm: str                                   # primary manager (detect_pkg_manager)
+    native: dict[str, list[str]] = field(default_factory=dict)  # manager type -> packages
+    aur: list[str] = field(default_factory=list)
+    flatpaks: list[str] = field(default_factory=list)  # flatpaks.txt lines
+    flatpak_apps: list[FlatpakApp] = field(default_factory=list)
+    system_managers: list[str] = field(default_factory=list)  # detect_package_managers() types
+
+    @classmethod
+    def collect(cls) -> "PackageInventory":
+        pm = detect_pkg_manager()
+        inv = cls(pm=pm, system_managers=list(detect_package_managers().values()))
+        managers = list(dict.fromkeys(inv.system_managers + ([pm] if pm != "unknown" else [])))
+        # Every source is independent: total time is that of the slowest one
+        with ThreadPoolExecutor(max_workers=len(managers) + 2) as pool:
+            native = {t: pool.submit(list_installed_packages, t) for t in managers}
+            aur = pool.submit(list_installed_aur_packages)
+            apps = pool.submit(list_flatpak_apps)
+            inv.native = {t: f.result() for t, f in native.items()}
+            inv.aur = aur.result()
+            inv.flatpak_apps = apps.result()
+        inv.flatpaks = flatpak_lines(inv.flatpak_apps)
+        return inv
+
+    @property
+    def packages(self) -> list[str]:
+        """Packages of the primary manager (packages.txt)."""
+        return self.native.get(self.pm, [])
+
+    def system_packages(self) -> dict[str, list[str]]:
+        """All managers in the system-packages.json layout."""
+        all_packages = {t: self.native[t] for t in self.system_managers}
+        # Add AUR packages if any
+        if self.aur:
+            all_packages["aur"] = self.aur
+        # Add Flatpak packages
+        if self.flatpaks:
+            all_packages["flatpak"] = self.flatpaks
+        return all_packages
+
+    def system_files(self) -> dict[str, str]:
+        """File name -> content for system-packages.json and the per-manager <type>-packages.txt lists."""
+        all_packages = self.system_packages()
+        doc = dict(all_packages)
+        if self.flatpak_apps:
+            # refs in the list, remote/size/installation alongside
+            doc["flatpak"] = sorted(parse_flatpak_lines(self.flatpaks))
+            doc["flatpak-details"] = {
+                a.ref: {"origin": a.origin, "installed_size": a.installed_size, "installation": a.installation}
+                for a in self.flatpak_apps
+            }
+        files = {"system-packages.json": json.dumps(doc, indent=2, ensure_ascii=False)}
+        # Also save as individual files for easier processing
+        for pkg_type, pkg_list in all_packages.items():
+            if pkg_list:  # Only save if the package list is not empty
+                files[f"{pkg_type}-packages.txt"] = "\n".join(pkg_list) + "\n"
+        return files
+
+    def files(self) -> dict[str, str]:
+        """Every package list a full backup stores."""
+        return {
+            "packages.txt": "\n".join(self.packages) + "\n",
+            "flatpaks.txt": "\n".join(self.flatpaks) + "\n",
+            **self.system_files(),
+        }
+
+    def write(self, backup_dir: Path, full: bool = True):
+        for name, content in (self.files() if full else self.system_files()).items():
+            write_text(backup_dir / name, content)
+
+
 def list_all_system_packages() -> dict[str, list[str]]:
     """List all installed packages from all available package managers."""
-    all_packages = {}
+    return PackageInventory.collect().system_packages()
 
-    # Detect system package managers
-    pm_info = detect_package_managers()
-    for pm_name, pm_type in pm_info.items():
-        all_packages[pm_type] = list_installed_packages(pm_type)
 
-    # Add AUR packages if any
-    aur_packages = list_installed_aur_packages()
-    if aur_packages:
-        all_packages["aur"] = aur_packages
+def save_system_package_manifest(backup_dir: Path, inventory: PackageInventory | None = None):
+    """Save a comprehensive manifest of all installed packages to the backup."""
+    (inventory or PackageInventory.collect()).write(backup_dir, full=False)
 
-    # Add Flatpak packages
-    flatpak_packages = list_flatpaks()
-    if flatpak_packages:
-        all_packages["flatpak"] = flatpak_packages
 
-    return all_packages
+# --------------------- inventory cache ---------------------
+# preview / dry-run / restore only need "what is installed right now". The lists are cached
+# under $XDG_CACHE_HOME and reused while the package databases they were read from keep the
+# same mtime and size; any install/remove rewrites those files and invalidates the entry.
 
-def save_system_package_manifest(backup_dir: Path):
-    """Save a comprehensive manifest of all installed packages to the backup."""
-    all_packages = list_all_system_packages()
-    manifest_path = backup_dir / "system-packages.json"
-    write_text(manifest_path, json.dumps(all_packages, indent=2, ensure_ascii=False))
+INVENTORY_CACHE_VERSION = 1
+RPMDB_LEGACY_PATHS = ("var/lib/rpm/Packages", "var/lib/rpm/Packages.db")
 
-    # Also save as individual files for easier processing
-    for pkg_type, pkg_list in all_packages.items():
-        if pkg_list:  # Only save if the package list is not empty
-            write_text(backup_dir / f"{pkg_type}-packages.txt", "\n".join(pkg_list) + "\n")
 
+def inventory_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "kde-profile-backup"
 
-def list_flatpaks() -> list[str]:
-    if not which("flatpak"):
-        return []
+
+def _package_db_sources(pm: str, root: Path = Path("/")) -> list[Path]:
+    if pm in {"dnf", "rpm", "zypper"}:
+        rels = [r + sfx for r in RPMDB_SQLITE_PATHS for sfx in ("", "-wal")] + list(RPMDB_LEGACY_PATHS)
+    elif pm == "apt":
+        rels = [DPKG_STATUS, APT_EXTENDED_STATES]
+    elif pm == "pacman":
+        # The local db dir only changes when packages come or go; `pacman -D --asexplicit`
+        # rewrites an existing desc in place, which shows up as the newest desc mtime
+        rels = [PACMAN_LOCAL_DB, PACMAN_LOCAL_DB + "/ALPM_DB_VERSION", PACMAN_LOG]
+        newest = _newest_pacman_desc(root / PACMAN_LOCAL_DB)
+        if newest is not None:
+            return [root / r for r in rels] + [newest]
+    else:
+        rels = []
+    return [root / r for r in rels]
+
+
+def _newest_pacman_desc(local_db: Path) -> Path | None:
+    newest, newest_mtime = None, -1
     try:
-        res = run(["flatpak", "list", "--app", "--columns=ref"])
-        return sorted(set(line.strip() for line in res.stdout.splitlines() if line.strip()))
-    except subprocess.CalledProcessError:
-        return []
+        with os.scandir(local_db) as it:
+            for e in it:
+                try:
+                    mtime = os.stat(os.path.join(e.path, "desc")).st_mtime_ns
+                except OSError:
+                    continue
+                if mtime > newest_mtime:
+                    newest, newest_mtime = Path(e.path) / "desc", mtime
+    except OSError:
+        return None
+    return newest
+
+
+def _flatpak_sources() -> list[Path]:
+    # app/ changes when an app id appears or disappears, app/<id> when one of its branches does
+    sources = []
+    for _, inst in _flatpak_installations():
+        app_root = inst / "app"
+        sources.append(app_root)
+        try:
+            sources.extend(sorted(p for p in app_root.iterdir() if p.is_dir()))
+        except OSError:
+            pass
+    return sources
+
+
+def _sources_fingerprint(sources: list[Path]) -> list | None:
+    fp = []
+    for src in sources:
+        try:
+            st = src.stat()
+        except OSError:
+            continue
+        fp.append([str(src), st.st_mtime_ns, st.st_size])
+    return fp or None
+
+
+def _cached_list(key: str, sources: list[Path], compute) -> list[str]:
+    """Return compute() through the on-disk cache. Without any existing source there is
+    nothing to invalidate on, so the list is computed every time."""
+    fingerprint = _sources_fingerprint(sources)
+    if fingerprint is None:
+        return compute()
+    path = inventory_cache_dir() / f"{key}.json"
+    try:
+        data = json.loads(read_text(path))
+        if data.get("version") == INVENTORY_CACHE_VERSION and data.get("fingerprint") == fingerprint:
+            return list(data["items"])
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    items = compute()
+    try:
+        ensure_dir(path.parent)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        write_text(tmp, json.dumps({"version": INVENTORY_CACHE_VERSION, "fingerprint": fingerprint,
+                                    "items": items}, ensure_ascii=False))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # cache is best-effort
+    return items
+
+
+def cached_installed_packages(pm: str) -> list[str]:
+    return _cached_list(f"packages-{pm}", _package_db_sources(pm), lambda: list_installed_packages(pm))
+
+
+def cached_flatpaks() -> list[str]:
+    return _cached_list("flatpaks", _flatpak_sources(), list_flatpaks)
 
 
 def write_text(path: Path, content: str):
@@ -248,16 +1587,290 @@ def load_meta(backup_dir: Path) -> dict:
     return {}
 
 
+# --------------------- backup catalog ---------------------
+# kde-backups/catalog.sqlite indexes every backup directory (timestamp, tags, host, profile,
+# scope, size, file count) so selectors do not list BACKUP_ROOT or parse each meta.json.
+# Backups update their row when they finish. When BACKUP_ROOT changed after the catalog was
+# last written (a directory copied in or deleted by hand), lookups first add/drop just those
+# rows; `reindex` rebuilds every row from disk.
+# The history_* tables hold each backup's file hashes and package names for `history`; they are
+# filled incrementally (only backups not indexed yet, or whose manifest/package lists changed).
+# Config keys are stored once per file content (history_ini, keyed by hash), not per backup.
+
+CATALOG_NAME = "catalog.sqlite"
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    name TEXT PRIMARY KEY,
+    created TEXT,
+    host TEXT,
+    profile TEXT,
+    pkg_manager TEXT,
+    scope TEXT,
+    size INTEGER,
+    files INTEGER
+);
+CREATE TABLE IF NOT EXISTS tags (
+    name TEXT NOT NULL REFERENCES backups(name) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, name)
+);
+CREATE TABLE IF NOT EXISTS history_seen (
+    name TEXT PRIMARY KEY REFERENCES backups(name) ON DELETE CASCADE,
+    stamp TEXT NOT NULL,
+    kinds TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history_files (
+    name TEXT NOT NULL REFERENCES history_seen(name) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    hash TEXT,
+    size INTEGER,
+    PRIMARY KEY (path, name)
+);
+CREATE INDEX IF NOT EXISTS history_files_name ON history_files(name);
+CREATE TABLE IF NOT EXISTS history_packages (
+    name TEXT NOT NULL REFERENCES history_seen(name) ON DELETE CASCADE,
+    package TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    PRIMARY KEY (package, kind, name)
+);
+CREATE INDEX IF NOT EXISTS history_packages_name ON history_packages(name);
+CREATE TABLE IF NOT EXISTS history_ini (
+    hash TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (hash, grp, key)
+);
+CREATE TABLE IF NOT EXISTS history_blobs (
+    hash TEXT PRIMARY KEY
+);
+"""
+
+
+class Catalog:
+    def __init__(self, root: Path | None = None):
+        self.root = root or BACKUP_ROOT
+        self.path = self.root / CATALOG_NAME
+
+    def _connect(self):
+        import sqlite3
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA foreign_keys = ON")
+        con.executescript(CATALOG_SCHEMA)
+        return con
+
+    def _touch(self):
+        # The sqlite journal lives in BACKUP_ROOT too; stamp the catalog after it is gone
+        os.utime(self.path)
+
+    def _meta_mtime(self, name: str) -> int:
+        try:
+            return (self.root / name / "meta.json").stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    def _stale(self) -> bool:
+        """Backup dirs added/removed (BACKUP_ROOT mtime) or a meta.json edited since the last write."""
+        try:
+            stamp = self.path.stat().st_mtime_ns
+            # >=: both can fall into the same coarse filesystem timestamp tick
+            if self.root.stat().st_mtime_ns >= stamp:
+                return True
+        except FileNotFoundError:
+            return True
+        return any(self._meta_mtime(name) >= stamp for name in self._disk_names())
+
+    def _query(self, sql: str, params=()) -> list[tuple]:
+        if not self.root.exists():
+            return []
+        if self._stale():
+            self.refresh()
+        con = self._connect()
+        try:
+            return con.execute(sql, params).fetchall()
+        finally:
+            con.close()
+
+    def _existing(self, sql: str, params=()) -> list[Path]:
+        return [p for p in (self.root / name for (name,) in self._query(sql, params)) if p.is_dir()]
+
+    @staticmethod
+    def _row(backup_dir: Path, size: int | None, files: int | None) -> tuple:
+        meta = load_meta(backup_dir)
+        if size is None or files is None:
+            size = files = 0
+            for e in _scan_files(backup_dir):
+                try:
+                    size += e.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                files += 1
+        scope = sorted(k for k, v in (meta.get("scope") or {}).items() if v)
+        row = (backup_dir.name, meta.get("created"), meta.get("host"), meta.get("profile"),
+               meta.get("pkg_manager"), ",".join(scope), size, files)
+        tags = sorted({str(t).lower() for t in meta.get("tags") or []})
+        return row, tags
+
+    @staticmethod
+    def _store(con, row: tuple, tags: list[str]):
+        # Upsert, not INSERT OR REPLACE: a replace deletes the row first and the cascade
+        # would drop the backup's history_* rows with it
+        con.execute("INSERT INTO backups VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                    "created = excluded.created, host = excluded.host, profile = excluded.profile, "
+                    "pkg_manager = excluded.pkg_manager, scope = excluded.scope, size = excluded.size, "
+                    "files = excluded.files", row)
+        con.execute("DELETE FROM tags WHERE name = ?", (row[0],))
+        con.executemany("INSERT INTO tags VALUES (?, ?)", [(row[0], t) for t in tags])
+
+    def record(self, backup_dir: Path, size: int | None = None, files: int | None = None):
+        """Add or refresh the row of one backup (size/files are counted when not given)."""
+        if not self.path.exists():
+            self.refresh()  # first catalog: index the backups made before it as well
+        row, tags = self._row(backup_dir, size, files)
+        con = self._connect()
+        try:
+            with con:
+                self._store(con, row, tags)
+        finally:
+            con.close()
+        self._touch()
+
+    def remove(self, name: str):
+        if not self.path.exists():
+            return
+        con = self._connect()
+        try:
+            with con:
+                con.execute("DELETE FROM backups WHERE name = ?", (name,))
+        finally:
+            con.close()
+        self._touch()
+
+    def _disk_names(self) -> list[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and p.name not in NON_BACKUP_DIRS)
+
+    def refresh(self):
+        """Add rows for backup dirs the catalog does not know, drop rows of deleted ones and
+        re-read meta.json files edited since the last write (size/files are kept)."""
+        on_disk = self._disk_names()
+        try:
+            stamp = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        con = self._connect()
+        try:
+            known = {name: (size, files) for name, size, files in con.execute("SELECT name, size, files FROM backups")}
+            with con:
+                con.executemany("DELETE FROM backups WHERE name = ?", [(n,) for n in set(known) - set(on_disk)])
+                for name in on_disk:
+                    if name not in known:
+                        self._store(con, *self._row(self.root / name, None, None))
+                    elif stamp is None or self._meta_mtime(name) >= stamp:
+                        self._store(con, *self._row(self.root / name, *known[name]))
+        finally:
+            con.close()
+        self._touch()
+
+    def reindex(self) -> int:
+        """Rebuild every row from the backup directories on disk."""
+        rows = [self._row(self.root / name, None, None) for name in self._disk_names()]
+        con = self._connect()
+        try:
+            with con:
+                con.execute("DELETE FROM backups")
+                con.execute("DELETE FROM history_ini")
+                con.execute("DELETE FROM history_blobs")
+                for row, tags in rows:
+                    self._store(con, row, tags)
+        finally:
+            con.close()
+        self._touch()
+        return len(rows)
+
+    def backups(self) -> list[Path]:
+        return self._existing("SELECT name FROM backups ORDER BY name")
+
+    def update_history(self) -> int:
+        """Index backups the history tables have not seen, or whose stamp changed (latest/).
+        Returns the number of backups (re)indexed."""
+        backups = self.backups()
+        con = self._connect()
+        try:
+            seen = dict(con.execute("SELECT name, stamp FROM history_seen"))
+            todo = []
+            for backup_dir in backups:
+                stamp = _history_stamp(backup_dir)
+                if seen.get(backup_dir.name) != stamp:
+                    todo.append((backup_dir, stamp))
+            if not todo:
+                return 0
+            parsed = {h for (h,) in con.execute("SELECT hash FROM history_blobs")}
+            for backup_dir, stamp in todo:
+                files, packages, kinds = _history_snapshot(backup_dir)
+                with con:
+                    con.execute("DELETE FROM history_seen WHERE name = ?", (backup_dir.name,))
+                    con.execute("INSERT INTO history_seen VALUES (?, ?, ?)", (backup_dir.name, stamp, ",".join(kinds)))
+                    con.executemany("INSERT OR REPLACE INTO history_files VALUES (?, ?, ?, ?)",
+                                    [(backup_dir.name, path, digest, size) for path, digest, size in files])
+                    con.executemany("INSERT OR IGNORE INTO history_packages VALUES (?, ?, ?)",
+                                    [(backup_dir.name, pkg, kind) for pkg, kind in packages])
+                    for path, digest, size in files:
+                        if digest in parsed or not _history_config_path(path) or size > INI_DIFF_MAX_BYTES:
+                            continue
+                        try:
+                            ini = _as_kde_ini((backup_dir / path).read_bytes())
+                        except OSError:
+                            continue
+                        con.executemany("INSERT OR REPLACE INTO history_ini VALUES (?, ?, ?, ?)",
+                                        [(digest, g, k, v) for g, keys in (ini or {}).items() for k, v in keys.items()])
+                        con.execute("INSERT OR IGNORE INTO history_blobs VALUES (?)", (digest,))
+                        parsed.add(digest)
+        finally:
+            con.close()
+        self._touch()
+        return len(todo)
+
+    def history_backups(self, kind: str | None = None) -> list[str]:
+        """Indexed backups in the order they were taken (meta.json "created"; latest/ is rewritten
+        by quick backups, so its name says nothing about its age). With `kind`, only those that
+        contain that part (extra-config, extra-data, package, flatpak), so a backup made without
+        it does not read as a removal."""
+        rows = self.history_rows("SELECT h.name, h.kinds FROM history_seen h JOIN backups b ON b.name = h.name "
+                                 "ORDER BY COALESCE(b.created, h.name), h.name")
+        return [name for name, kinds in rows if kind is None or kind in kinds.split(",")]
+
+    def history_rows(self, sql: str, params=()) -> list[tuple]:
+        con = self._connect()
+        try:
+            return con.execute(sql, params).fetchall()
+        finally:
+            con.close()
+
+    def latest_with_tag(self, tag: str) -> Path | None:
+        found = self._existing("SELECT name FROM tags WHERE tag = ? ORDER BY name DESC LIMIT 1", (tag.lower(),))
+        return found[0] if found else None
+
+    def latest_with_prefix(self, prefix: str) -> Path | None:
+        found = self._existing("SELECT name FROM backups WHERE name >= ? AND name < ? ORDER BY name DESC LIMIT 1",
+                               (prefix, prefix + "\U0010ffff"))
+        return found[0] if found else None
+
+
 def find_backup_by_tag(tag: str) -> Path | None:
+    return Catalog().latest_with_tag(tag)
+
+
+def find_backup_by_prefix(prefix: str) -> Path | None:
+    """Newest backup whose timestamp (directory name) starts with `prefix`."""
+    return Catalog().latest_with_prefix(prefix)
+
+
+def do_reindex():
     if not BACKUP_ROOT.exists():
-        return None
-    candidates = []
-    for p in sorted([x for x in BACKUP_ROOT.iterdir() if x.is_dir()]):
-        meta = load_meta(p)
-        tags = [t.lower() for t in meta.get("tags", [])]
-        if tag.lower() in tags:
-            candidates.append(p)
-    return candidates[-1] if candidates else None
+        print("[!] Yedek dizini bulunamadı:", BACKUP_ROOT)
+        return
+    n = Catalog().reindex()
+    print(f"[✓] Katalog yeniden oluşturuldu: {n} yedek ({BACKUP_ROOT / CATALOG_NAME})")
 
 
 def _find_knsv(backup_dir: Path) -> Path | None:
@@ -265,6 +1878,50 @@ def _find_knsv(backup_dir: Path) -> Path | None:
     return files[-1] if files else None
 
 
+# --------------------- backup targets (relative to $HOME) ---------------------
+
+# Critical KDE config files (extra-config/)
+EXTRA_CONFIG_FILES = [
+    Path(".config/plasma-org.kde.plasma.desktop-appletsrc"),
+    Path(".config/kdeglobals"),
+    Path(".config/kwinrc"),
+    Path(".config/mimeapps.list"),  # MIME associations
+]
+# User data directories (extra-data/); quick backup drops them from latest/ when the source is gone
+EXTRA_DATA_DIRS = [
+    Path(".local/share/applications"),
+    Path(".local/share/plasma_notes"),
+    Path(".local/share/plasma-systemmonitor"),
+    Path(".local/zed-preview.app"),
+    Path(".config/autostart"),  # Autostart applications
+]
+# Additional important security and configuration directories
+IMPORTANT_DIRS = [
+    Path(".ssh"),  # SSH keys and config
+    Path(".gnupg"),  # GPG keys
+    Path(".pki"),  # SSL certificates
+]
+# Browser/email client directories, only if they exist and have content
+BROWSER_DIRS = [
+    Path(".mozilla"),  # Firefox profiles (can be huge, consider size)
+    Path(".thunderbird"),  # Email client profiles
+    Path(".config/BraveSoftware/Brave-Browser"),  # Brave browser profiles
+    Path(".config/BraveSoftware/Brave-Browser-Nightly"),  # Brave Nightly profiles
+    Path(".config/google-chrome"),  # Chrome profiles (if used)
+    Path(".config/chromium"),  # Chromium profiles
+]
+# Important config files in home directory root
+HOME_FILES = [
+    Path(".gitconfig"),
+    Path(".gtkrc-2.0"),
+    Path(".viminfo"),
+    Path(".zshrc"),
+    Path(".bashrc"),
+    Path(".bash_profile"),
+    Path(".p10k.zsh"),  # Powerlevel10k config
+]
+
+
 # --------------------- konsave ops ---------------------
 
 def check_konsave():
@@ -290,6 +1947,10 @@ def konsave_save_and_export(profile: str, backup_dir: Path, archive_name: str =
     if KONSAVE_EXTRA_ARGS:
         cmd_export += KONSAVE_EXTRA_ARGS
     run(cmd_export)
+    try:
+        knsv_index(export_path)
+    except (tarfile.TarError, zipfile.BadZipFile, OSError, EOFError):
+        pass  # built on first compare/verify instead
     return export_path
 
 
@@ -309,7 +1970,7 @@ def cleanup_old_backups(keep_count: int = 3):
     # Get all backup directories sorted by name (which includes timestamp)
     backup_dirs = [d for d in BACKUP_ROOT.iterdir()
                    if d.is_dir() and d.name != "latest"  # Don't delete "latest" symlink/directory
-                   and d.name not in ["archive", "scripts"]]  # Exclude other known directories
+                   and d.name not in NON_BACKUP_DIRS]  # Exclude other known directories
 
     # Sort by name which should sort chronologically due to timestamp format
     backup_dirs.sort(key=lambda x: x.name, reverse=True)
@@ -319,157 +1980,91 @@ def cleanup_old_backups(keep_count: int = 3):
         try:
             import shutil
             shutil.rmtree(old_dir)
+            Catalog().remove(old_dir.name)
             print(f"[i] Eski yedek silindi: {old_dir.name}")
-        except OSError as e:
-            print(f"[!] Eski yedek silinemedi {old_dir.name}: {e}")
-
-
-def do_backup(tags: list[str] | None = None, scope_override: set[str] | None = None):
-    if not check_konsave():
-        return
-
-    ensure_dir(BACKUP_ROOT)
-    ts = timestamp()
-    backup_dir = BACKUP_ROOT / ts
-    ensure_dir(backup_dir)
-
-    profile = input(f"Profil adı (Enter={DEFAULT_PROFILE}): ") or DEFAULT_PROFILE
-
-    print("[i] KDE ayarları export ediliyor (konsave)...")
-    knsv = konsave_save_and_export(profile, backup_dir, archive_name=profile)
-
-    print("[i] Paket listesi alınıyor...")
-    pm = detect_pkg_manager()
-    pkgs = list_installed_packages(pm)
-    write_text(backup_dir / "packages.txt", "\n".join(pkgs) + "\n")
-
-    print("[i] Flatpak uygulamaları listeleniyor...")
-    fps = list_flatpaks()
-    write_text(backup_dir / "flatpaks.txt", "\n".join(fps) + "\n")
-
-    print("[i] Tüm sistem paketleri listeleniyor (AUR, Flatpak, vs.)...")
-    save_system_package_manifest(backup_dir)
+        except OSError as e:
+            print(f"[!] Eski yedek silinemedi {old_dir.name}: {e}")
 
+    # Drop blobs that no remaining snapshot links to
+    removed = ObjectStore(BACKUP_ROOT / OBJECTS_DIRNAME).prune()
+    if removed:
+        print(f"[i] Kullanılmayan {removed} nesne silindi (objects/).")
+
+
+class PhaseRunner:
+    """Tiny task scheduler for independent backup phases (subprocess- or I/O-bound).
+    Phases run concurrently; each one is reported as it finishes. wait() returns the
+    results by name and re-raises the first failure once every phase has ended."""
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="phase")
+        self._futures = {}
+        self._started = time.monotonic()
+
+    def add(self, name: str, fn, *args):
+        def timed():
+            t0 = time.monotonic()
+            result = fn(*args)
+            return result, time.monotonic() - t0
+        self._futures[self._pool.submit(timed)] = name
+
+    def wait(self) -> dict:
+        results: dict = {}
+        timings: dict[str, float] = {}
+        failure: BaseException | None = None
+        total = len(self._futures)
+        try:
+            for i, fut in enumerate(as_completed(self._futures), 1):
+                name = self._futures[fut]
+                try:
+                    results[name], timings[name] = fut.result()
+                    print(f"[{i}/{total}] ✓ {name} ({timings[name]:.1f} sn)")
+                except BaseException as e:  # re-raised below, after the other phases settle
+                    print(f"[{i}/{total}] ✗ {name}: {e}")
+                    failure = failure or e
+        finally:
+            self._pool.shutdown(wait=True)
+        if timings:
+            slowest = max(timings, key=timings.get)
+            print(f"[i] Aşamalar {time.monotonic() - self._started:.1f} sn sürdü (en yavaş: {slowest}).")
+        if failure is not None:
+            raise failure
+        return results
+
+
+def _iter_backup_files(home: Path):
+    """Yield (source, path inside the backup, target) for every file a full backup stores."""
     # Extra: kritik KDE config dosyalarını ayrıca yedekle (konsave eksikse garanti olsun)
-    extra_root = backup_dir / "extra-config"
-    ensure_dir(extra_root)
-    home = Path.home()
-    extra_targets = [
-        Path(".config/plasma-org.kde.plasma.desktop-appletsrc"),
-        Path(".config/kdeglobals"),
-        Path(".config/kwinrc"),
-        Path(".config/mimeapps.list"),  # MIME associations
-    ]
-    saved_extra: list[str] = []
-    for rel in extra_targets:
+    for rel in EXTRA_CONFIG_FILES:
         src = home / rel
         if src.exists():
-            dst = extra_root / rel
-            ensure_dir(dst.parent)
-            try:
-                shutil.copy2(src, dst)
-                saved_extra.append(str(rel))
-            except OSError:
-                pass
-
-    # Extra-data: kullanıcının önemli gördüğü veri klasörleri
-    extra_data_root = backup_dir / "extra-data"
-    ensure_dir(extra_data_root)
-    extra_data_targets = [
-        Path(".local/share/applications"),
-        Path(".local/share/plasma_notes"),
-        Path(".local/share/plasma-systemmonitor"),
-        Path(".local/zed-preview.app"),
-        Path(".config/autostart"),  # Autostart applications
-    ]
-    saved_extra_data: list[str] = []
-    for rel in extra_data_targets:
+            yield src, Path("extra-config") / rel, rel
+    # Extra-data: kullanıcının önemli gördüğü veri klasörleri, güvenlik dizinleri ve
+    # tarayıcı/e-posta profilleri; klasör ağacı file-by-file (izinler korunarak)
+    for rel in EXTRA_DATA_DIRS + IMPORTANT_DIRS + BROWSER_DIRS:
         src_dir = home / rel
         if src_dir.exists():
-            # Klasör ağacını file-by-file kopyala (izinler korunarak)
-            for p in src_dir.rglob("*"):
-                if p.is_file():
-                    dst = extra_data_root / p.relative_to(home)
-                    ensure_dir(dst.parent)
-                    try:
-                        shutil.copy2(p, dst)
-                    except OSError:
-                        pass
-            saved_extra_data.append(str(rel))
-
-    # Additional important security and configuration files/directories
-    important_targets = [
-        Path(".ssh"),  # SSH keys and config
-        Path(".gnupg"),  # GPG keys
-        Path(".pki"),  # SSL certificates
-    ]
-
-    # Conditionally add browser/email client directories if they exist
-    browser_targets = [
-        Path(".mozilla"),  # Firefox profiles (can be huge, consider size)
-        Path(".thunderbird"),  # Email client profiles
-        Path(".config/BraveSoftware/Brave-Browser"),  # Brave browser profiles
-        Path(".config/BraveSoftware/Brave-Browser-Nightly"),  # Brave Nightly profiles
-        Path(".config/google-chrome"),  # Chrome profiles (if used)
-        Path(".config/chromium"),  # Chromium profiles
-    ]
-
-    for rel in important_targets:
-        src_path = home / rel
-        if src_path.exists():
-            # Copy entire directory structure for these important targets
-            for p in src_path.rglob("*"):
-                if p.is_file():
-                    dst = extra_data_root / p.relative_to(home)
-                    ensure_dir(dst.parent)
-                    try:
-                        shutil.copy2(p, dst)
-                    except OSError:
-                        pass
-            saved_extra_data.append(str(rel))
-
-    # Add browser and email client configs only if they exist
-    for rel in browser_targets:
-        src_path = home / rel
-        if src_path.exists():
-            # Check if directory has content before adding
-            try:
-                if any(src_path.rglob("*")):  # If directory has files
-                    for p in src_path.rglob("*"):
-                        if p.is_file():
-                            dst = extra_data_root / p.relative_to(home)
-                            ensure_dir(dst.parent)
-                            try:
-                                shutil.copy2(p, dst)
-                            except OSError:
-                                pass
-                    saved_extra_data.append(str(rel))
-            except (OSError, PermissionError):
-                # Skip if unable to read the directory
-                pass
-
+            for e in _scan_files(src_dir):
+                p = Path(e.path)
+                yield p, Path("extra-data") / p.relative_to(home), rel
     # Also backup some important config files in home directory root
-    important_files = [
-        Path(".gitconfig"),
-        Path(".gtkrc-2.0"),
-        Path(".viminfo"),
-        Path(".zshrc"),
-        Path(".bashrc"),
-        Path(".bash_profile"),
-        Path(".p10k.zsh"),  # Powerlevel10k config
-    ]
-
-    for rel_file in important_files:
+    for rel_file in HOME_FILES:
         src_file = home / rel_file
         if src_file.exists():
-            dst = extra_data_root / rel_file
-            ensure_dir(dst.parent)
-            try:
-                shutil.copy2(src_file, dst)
-                saved_extra_data.append(str(rel_file))
-            except OSError:
-                pass
+            yield src_file, Path("extra-data") / rel_file, rel_file
+
+
+def _saved_targets(home: Path, stored: set[Path]) -> tuple[list[str], list[str]]:
+    """meta.json extra_config / extra_data lists. `stored` holds targets with at least one stored file.
+    Data and security directories are listed when present; browser directories only with content."""
+    saved_extra = [str(rel) for rel in EXTRA_CONFIG_FILES if rel in stored]
+    saved_extra_data = [str(rel) for rel in EXTRA_DATA_DIRS + IMPORTANT_DIRS if (home / rel).exists()]
+    saved_extra_data += [str(rel) for rel in BROWSER_DIRS + HOME_FILES if rel in stored]
+    return saved_extra, saved_extra_data
 
+
+def _backup_meta(ts: str, pm: str, profile: str, tags: list[str] | None, scope_override: set[str] | None,
+                 knsv_name: str, saved_extra: list[str], saved_extra_data: list[str], **extra) -> dict:
     # scope in meta: if override provided, persist it; else default all true
     eff_scope = scope_override or set(SCOPE_KEYS)
     meta = {
@@ -477,6 +2072,7 @@ def do_backup(tags: list[str] | None = None, scope_override: set[str] | None = N
         "host": platform.node(),
         "os": platform.platform(),
         "pkg_manager": pm,
+        **extra,
         "profile": profile,
         "tags": tags or [],
         "scope": {
@@ -487,14 +2083,74 @@ def do_backup(tags: list[str] | None = None, scope_override: set[str] | None = N
             "extra_data": "extra_data" in eff_scope,
         },
         "files": {
-            "konsave_profile": str(knsv.name),
+            "konsave_profile": knsv_name,
             "packages": "packages.txt",
             "flatpaks": "flatpaks.txt",
         },
         "extra_config": saved_extra,
         "extra_data": saved_extra_data,
     }
+    return meta
+
+
+def do_backup(tags: list[str] | None = None, scope_override: set[str] | None = None,
+              archive_format: str | None = None):
+    if not check_konsave():
+        return
+
+    ensure_dir(BACKUP_ROOT)
+    ts = timestamp()
+    profile = input(f"Profil adı (Enter={DEFAULT_PROFILE}): ") or DEFAULT_PROFILE
+    if archive_format:
+        _backup_to_archive(ts, profile, archive_format, tags, scope_override)
+        return
+
+    backup_dir = BACKUP_ROOT / ts
+    ensure_dir(backup_dir)
+    home = Path.home()
+
+    def export_konsave() -> Path:
+        return konsave_save_and_export(profile, backup_dir, archive_name=profile)
+
+    def save_packages() -> PackageInventory:
+        inventory = PackageInventory.collect()
+        inventory.write(backup_dir)
+        return inventory
+
+    def copy_files() -> tuple[SnapshotWriter, set[Path]]:
+        writer = SnapshotWriter(backup_dir)
+        ensure_dir(backup_dir / "extra-config")
+        ensure_dir(backup_dir / "extra-data")
+        stored: set[Path] = set()  # targets with at least one stored file
+        with CopyEngine() as engine:
+            for src, dest, target in _iter_backup_files(home):
+                engine.submit(writer.add, src, backup_dir / dest, on_success=lambda t=target: stored.add(t))
+        engine.report("Yedekleme")
+        writer.write_manifest()
+        return writer, stored
+
+    # The phases are independent and mostly wait on subprocesses or disk I/O
+    print("[i] KDE ayarları (konsave), paket envanteri (AUR, Flatpak, vs.) ve extra-* dosyaları paralel yedekleniyor...")
+    phases = PhaseRunner()
+    phases.add("konsave export", export_konsave)
+    phases.add("paket envanteri", save_packages)
+    phases.add("extra-config/extra-data", copy_files)
+    results = phases.wait()
+    knsv = results["konsave export"]
+    pm = results["paket envanteri"].pm
+    writer, stored = results["extra-config/extra-data"]
+    saved_extra, saved_extra_data = _saved_targets(home, stored)
+    if writer.mode == "link" and writer.link_dest is not None:
+        print(f"[i] {writer.linked} değişmemiş dosya {writer.link_dest.name} yedeğine hardlink ile bağlandı.")
+
+    meta = _backup_meta(ts, pm, profile, tags, scope_override, str(knsv.name), saved_extra, saved_extra_data,
+                        snapshot_mode=writer.mode)
     write_text(backup_dir / "meta.json", json.dumps(meta, indent=2, ensure_ascii=False))
+    # Tree totals come from the manifest entries; only the top-level files need a stat
+    with os.scandir(backup_dir) as it:
+        top = [e.stat(follow_symlinks=False).st_size for e in it if e.is_file(follow_symlinks=False)]
+    Catalog().record(backup_dir, size=sum(e["size"] for e in writer.entries) + sum(top),
+                     files=len(writer.entries) + len(top))
 
     print("\n[✓] Yedek tamamlandı:")
     print(f"  Dizin: {backup_dir}")
@@ -505,6 +2161,16 @@ def do_backup(tags: list[str] | None = None, scope_override: set[str] | None = N
     cleanup_old_backups(keep_count=3)
 
 
+def _pkg_install_command(pm: str) -> str | None:
+    return {
+        "dnf": "sudo dnf install -y",
+        "rpm": "sudo dnf install -y",
+        "apt": "sudo apt install -y",
+        "pacman": "sudo pacman -S --needed",
+        "zypper": "sudo zypper install -y",
+    }.get(pm)
+
+
 def do_restore(selected_backup: Path | None = None, scope_override: set[str] | None = None, tag: str | None = None, timestamp_hint: str | None = None,
                yes_extra_config: bool | None = None, yes_extra_data: bool | None = None):
     """Restore flow respecting scope and selection by tag/timestamp.
@@ -521,8 +2187,7 @@ def do_restore(selected_backup: Path | None = None, scope_override: set[str] | N
         elif timestamp_hint == "latest":
             backup_dir = BACKUP_ROOT / "latest"
         elif timestamp_hint:
-            cands = sorted([p for p in BACKUP_ROOT.iterdir() if p.is_dir() and p.name.startswith(timestamp_hint)])
-            backup_dir = cands[-1] if cands else None
+            backup_dir = find_backup_by_prefix(timestamp_hint)
         else:
             backup_dir = pick_backup_dir()
     if not backup_dir or not backup_dir.exists():
@@ -530,214 +2195,168 @@ def do_restore(selected_backup: Path | None = None, scope_override: set[str] | N
         return
 
     print(f"[i] Restore kaynağı: {backup_dir}")
-    meta = load_meta(backup_dir)
-    scope = effective_scope(meta, scope_override)
+    plan = RestorePlan.build(backup_dir, scope_override)
+    scope = plan.scope
 
     # Konsave import/apply
     if "konsave" in scope:
-        knsv = _find_knsv(backup_dir)
-        if not knsv:
+        if not plan.knsv:
             print("[!] .knsv bulunamadı. Konsave kısmı atlandı.")
         else:
-            profile = meta.get("profile") or DEFAULT_PROFILE
             print("[i] Konsave profili içe aktarılıyor ve uygulanıyor...")
-            konsave_import_and_apply(knsv, profile)
+            konsave_import_and_apply(plan.knsv, plan.profile)
     else:
         print("[i] Scope gereği konsave uygulanmıyor.")
 
     # Packages commands (print only)
     if "packages" in scope:
-        pm = detect_pkg_manager()
-        desired = set(_list_lines(backup_dir / "packages.txt"))
-        if desired:
-            current = set(list_installed_packages(pm))
-            to_install = sorted(desired - current)
-            if to_install:
-                if pm == "dnf" or pm == "rpm":
-                    print("\n[Pkg] Kurulum komutu (örnek):")
-                    print("sudo dnf install -y ", " ".join(shlex.quote(x) for x in to_install))
-                elif pm == "apt":
-                    print("\n[Pkg] Kurulum komutu (örnek):")
-                    print("sudo apt install -y ", " ".join(shlex.quote(x) for x in to_install))
-                elif pm == "pacman":
-                    print("\n[Pkg] Kurulum komutu (örnek):")
-                    print("sudo pacman -S --needed ", " ".join(shlex.quote(x) for x in to_install))
-                elif pm == "zypper":
-                    print("\n[Pkg] Kurulum komutu (örnek):")
-                    print("sudo zypper install -y ", " ".join(shlex.quote(x) for x in to_install))
+        cmd = _pkg_install_command(plan.pm)
+        if plan.pkg_install and cmd:
+            print("\n[Pkg] Kurulum komutu (örnek):")
+            print(f"{cmd} ", " ".join(shlex.quote(x) for x in plan.pkg_install))
     else:
         print("[i] Scope gereği paket adımı atlandı.")
 
     # Flatpak commands (print only)
     if "flatpak" in scope:
-        desired_fp = set(_list_lines(backup_dir / "flatpaks.txt"))
-        if desired_fp:
-            current_fp = set(list_flatpaks())
-            to_install_fp = sorted(desired_fp - current_fp)
-            if to_install_fp:
-                print("\n[Flatpak] Kurulum komutu (örnek):")
-                print("flatpak install -y --noninteractive ", " ".join(shlex.quote(x) for x in to_install_fp))
+        if plan.fp_install:
+            print("\n[Flatpak] Kurulum komutu (örnek):")
+            for cmd in flatpak_install_commands(plan.fp_install):
+                print(cmd)
     else:
         print("[i] Scope gereği flatpak adımı atlandı.")
 
-    # Extra-config copy
-    extra_root = backup_dir / "extra-config"
-    if extra_root.exists() and "extra_config" in scope:
-        if yes_extra_config is None:
-            ans = input("\nEk KDE config dosyalarını (extra-config) yerine kopyalayayım mı? (E/h): ").strip().lower()
-            do_copy = ans in {"e", "evet", "y", "yes"}
-        else:
-            do_copy = yes_extra_config
-        if do_copy:
-            base = Path.home()
-            for p in sorted(extra_root.rglob("*")):
-                if p.is_file():
-                    rel = p.relative_to(extra_root)
-                    dest = base / rel
-                    ensure_dir(dest.parent)
-                    try:
-                        shutil.copy2(p, dest)
-                    except OSError as e:
-                        print(f"[!] Kopyalanamadı: {p} -> {dest}: {e}")
-    elif extra_root.exists():
-        print("[i] Scope gereği extra-config kopyalanmıyor.")
-
-    # Extra-data copy
-    extra_data_root = backup_dir / "extra-data"
-    if extra_data_root.exists() and "extra_data" in scope:
-        if yes_extra_data is None:
-            ans = input("Ek veri klasörlerini (extra-data) yerine kopyalayayım mı? (E/h): ").strip().lower()
+    # Extra-config / extra-data copy: only files the plan found new or different
+    base = Path.home()
+    manifest = load_manifest(backup_dir)
+    prompts = {
+        "extra-config": ("extra_config", yes_extra_config,
+                         "\nEk KDE config dosyalarını (extra-config) yerine kopyalayayım mı? (E/h): "),
+        "extra-data": ("extra_data", yes_extra_data,
+                       "Ek veri klasörlerini (extra-data) yerine kopyalayayım mı? (E/h): "),
+    }
+    for sub, (key, answer, question) in prompts.items():
+        root = backup_dir / sub
+        if not root.exists():
+            continue
+        if key not in scope:
+            print(f"[i] Scope gereği {sub} kopyalanmıyor.")
+            continue
+        if answer is None:
+            ans = input(question).strip().lower()
             do_copy = ans in {"e", "evet", "y", "yes"}
         else:
-            do_copy = yes_extra_data
+            do_copy = answer
         if do_copy:
-            base = Path.home()
-            for p in sorted(extra_data_root.rglob("*")):
-                if p.is_file():
-                    rel = p.relative_to(extra_data_root)
-                    dest = base / rel
-                    ensure_dir(dest.parent)
-                    try:
-                        shutil.copy2(p, dest)
-                    except OSError as e:
-                        print(f"[!] Kopyalanamadı: {p} -> {dest}: {e}")
-    elif extra_data_root.exists():
-        print("[i] Scope gereği extra-data kopyalanmıyor.")
+            diff = plan.trees.get(sub, TreeDiff())
+            with CopyEngine() as engine:
+                for rel in diff.new + diff.changed:
+                    entry = manifest.get(f"{sub}/{rel.as_posix()}")
+                    engine.submit(partial(_restore_file, entry=entry), root / rel, base / rel)
+            engine.report()
+    # $HOME changed: the next preview must not reuse this plan
+    plan.invalidate()
 
     print("\n[✓] Restore tamamlandı (paket/flatpak komutları yalnızca gösterildi).")
 
 
-def do_quick_backup():
-    """Incremental sync of extra-config and extra-data into kde-backups/latest.
-    Optionally export konsave as well (skipped by default for speed)."""
-    latest_dir = BACKUP_ROOT / "latest"
-    ensure_dir(latest_dir)
-
-    home = Path.home()
-    # extra-config files
-    extra_cfg = [
-        Path(".config/plasma-org.kde.plasma.desktop-appletsrc"),
-        Path(".config/kdeglobals"),
-        Path(".config/kwinrc"),
-        Path(".config/mimeapps.list"),  # MIME associations
-    ]
-    dst_cfg_root = latest_dir / "extra-config"
-    ensure_dir(dst_cfg_root)
-    desired_cfg: set[Path] = set()
-    for rel in extra_cfg:
+def _quick_sync_full(index: StatIndex, engine: CopyEngine, home: Path):
+    """Walk every quick backup target (index-based, see StatIndex)."""
+    # extra-config files; files in extra-config that are not desired anymore are removed
+    index.own("extra-config")
+    for rel in EXTRA_CONFIG_FILES:
         src = home / rel
-        dst = dst_cfg_root / rel
         if src.exists():
-            _copy_if_changed(src, dst)
-            desired_cfg.add(dst)
-    # remove files in extra-config not desired anymore
-    for p in list(dst_cfg_root.rglob("*")):
-        if p.is_file() and p not in desired_cfg:
-            try:
-                p.unlink()
-            except OSError:
-                pass
+            index.sync_file(src, f"extra-config/{rel.as_posix()}", engine)
 
     # extra-data directories
-    extra_data_dirs = [
-        Path(".local/share/applications"),
-        Path(".local/share/plasma_notes"),
-        Path(".local/share/plasma-systemmonitor"),
-        Path(".local/zed-preview.app"),
-        Path(".config/autostart"),  # Autostart applications
-    ]
-    dst_data_root = latest_dir / "extra-data"
-    ensure_dir(dst_data_root)
-    for rel in extra_data_dirs:
+    for rel in EXTRA_DATA_DIRS:
         src_dir = home / rel
-        dst_dir = dst_data_root / rel
+        key = f"extra-data/{rel.as_posix()}"
         if src_dir.exists():
-            _sync_tree(src_dir, dst_dir)
+            index.sync_tree(src_dir, key, engine)
         else:
             # Source missing -> ensure dest removed
-            if dst_dir.exists():
-                # Remove directory tree safely
-                for p in sorted(dst_dir.rglob("*"), reverse=True):
-                    try:
-                        p.unlink() if p.is_file() else p.rmdir()
-                    except OSError:
-                        pass
-                try:
-                    dst_dir.rmdir()
-                except OSError:
-                    pass
+            index.drop(key)
 
     # Additional important security and configuration files/directories for quick backup
-    important_targets = [
-        Path(".ssh"),  # SSH keys and config
-        Path(".gnupg"),  # GPG keys
-        Path(".pki"),  # SSL certificates
-    ]
-
-    for rel in important_targets:
+    for rel in IMPORTANT_DIRS:
         src_path = home / rel
         if src_path.exists():
-            _sync_tree(src_path, dst_data_root / rel)
+            index.sync_tree(src_path, f"extra-data/{rel.as_posix()}", engine)
 
     # Conditionally sync browser/email client configs only if they exist
-    browser_targets = [
-        Path(".mozilla"),  # Firefox profiles (can be huge, consider size)
-        Path(".thunderbird"),  # Email client profiles
-        Path(".config/BraveSoftware/Brave-Browser"),  # Brave browser profiles
-        Path(".config/BraveSoftware/Brave-Browser-Nightly"),  # Brave Nightly profiles
-        Path(".config/google-chrome"),  # Chrome profiles (if used)
-        Path(".config/chromium"),  # Chromium profiles
-    ]
-
-    for rel in browser_targets:
+    for rel in BROWSER_DIRS:
         src_path = home / rel
-        dst_path = dst_data_root / rel
         if src_path.exists():
             # Check if directory has content before syncing
-            try:
-                if any(src_path.rglob("*")):  # If directory has files
-                    _sync_tree(src_path, dst_path)
-            except (OSError, PermissionError):
-                # Skip if unable to read the directory
-                pass
+            if _has_entries(src_path):
+                index.sync_tree(src_path, f"extra-data/{rel.as_posix()}", engine)
 
     # Also sync important config files in home directory root
-    important_files = [
-        Path(".gitconfig"),
-        Path(".gtkrc-2.0"),
-        Path(".viminfo"),
-        Path(".zshrc"),
-        Path(".bashrc"),
-        Path(".bash_profile"),
-        Path(".p10k.zsh"),  # Powerlevel10k config
-    ]
-
-    for rel_file in important_files:
+    for rel_file in HOME_FILES:
         src_file = home / rel_file
-        dst_file = dst_data_root / rel_file
         if src_file.exists():
-            ensure_dir(dst_file.parent)
-            _copy_if_changed(src_file, dst_file)
+            index.sync_file(src_file, f"extra-data/{rel_file.as_posix()}", engine)
+
+
+def _quick_sync_journal(paths: set[str], index: StatIndex, engine: CopyEngine, home: Path):
+    """Sync only the paths recorded by the watcher, with the same rules as _quick_sync_full."""
+    # A journaled directory covers everything below it
+    roots: list[tuple[str, tuple[Path, str]]] = []
+    for p in sorted(paths):
+        target = _match_target(p)
+        if target is not None and (not roots or not _under(p, roots[-1][0])):
+            roots.append((p, target))
+    for p, (rel, kind) in roots:
+        src = home / p
+        key = f"{'extra-config' if kind == 'config' else 'extra-data'}/{p}"
+        if kind in {"config", "file"}:
+            if src.is_file():
+                index.sync_file(src, key, engine)
+            elif kind == "config":
+                index.own(key)
+            continue
+        if p == rel.as_posix():
+            # The target directory itself appeared or disappeared
+            if src.is_dir():
+                if kind != "browser" or _has_entries(src):
+                    index.sync_tree(src, key, engine)
+            elif kind == "data":
+                index.drop(key)
+            continue
+        if src.is_dir():
+            index.sync_tree(src, key, engine)
+        elif src.is_file():
+            index.sync_file(src, key, engine)
+        else:
+            index.own(key)
+
+
+def do_quick_backup():
+    """Incremental sync of extra-config and extra-data into kde-backups/latest.
+    Optionally export konsave as well (skipped by default for speed).
+    If a complete `watch` process is running, only the paths in its change journal are synced."""
+    latest_dir = BACKUP_ROOT / "latest"
+    ensure_dir(latest_dir)
+    ensure_dir(latest_dir / "extra-config")
+    ensure_dir(latest_dir / "extra-data")
+
+    home = Path.home()
+    index = StatIndex(latest_dir)
+    journal = ChangeJournal(latest_dir)
+    # Taken before syncing: changes made while we run land in a fresh journal for next time
+    changed = journal.take() if journal.watcher_complete() else None
+    with CopyEngine() as engine:
+        if changed is None or not index.loaded:
+            _quick_sync_full(index, engine, home)
+        else:
+            print(f"[i] Değişiklik günlüğünden {len(changed)} yol senkronlanıyor (watch).")
+            _quick_sync_journal(changed, index, engine, home)
+    engine.report("Quick backup")
+    index.finish()
+    journal.commit()
+    print(f"[i] {index.skipped} dosya değişmemiş (stat indeksi), {engine.done} dosya kopyalandı.")
 
     # meta.json
     ts = timestamp()
@@ -763,6 +2382,8 @@ def do_quick_backup():
     # Save comprehensive system package manifest for quick backup as well
     print("[i] Quick backup için sistem paketleri listeleniyor (AUR, Flatpak, vs.)...")
     save_system_package_manifest(latest_dir)
+    # Sizes come from the stat index, so latest/ is not walked again
+    Catalog().record(latest_dir, size=sum(e[0] for e in index.new.values()), files=len(index.new))
 
     # Perform cleanup of old regular backups, keep only the 3 most recent ones
     cleanup_old_backups(keep_count=3)
@@ -774,6 +2395,245 @@ def _list_lines(p: Path) -> list[str]:
     return [x.strip() for x in p.read_text().splitlines() if x.strip()]
 
 
+@dataclass
+class TreeDiff:
+    """extra-config/ or extra-data/ of a backup against the live $HOME."""
+    new: list[Path] = field(default_factory=list)       # missing in $HOME
+    changed: list[Path] = field(default_factory=list)   # would be overwritten
+    sizes: dict[Path, int] = field(default_factory=dict)  # backup-side size of new/changed files
+    hashed: int = 0                                       # live files that had to be read
+    unchanged: dict[Path, tuple[int, int]] = field(default_factory=dict)  # live (size, mtime_ns)
+
+    def to_json(self) -> dict:
+        return {"new": [p.as_posix() for p in self.new], "changed": [p.as_posix() for p in self.changed],
+                "sizes": {p.as_posix(): n for p, n in self.sizes.items()}, "hashed": self.hashed,
+                "unchanged": {p.as_posix(): list(v) for p, v in self.unchanged.items()}}
+
+    @classmethod
+    def from_json(cls, d: dict) -> "TreeDiff":
+        return cls([Path(p) for p in d["new"]], [Path(p) for p in d["changed"]],
+                   {Path(p): n for p, n in d["sizes"].items()}, d.get("hashed", 0),
+                   {Path(p): (v[0], v[1]) for p, v in d.get("unchanged", {}).items()})
+
+    def still_valid(self, home: Path) -> bool:
+        """True while every file found identical still has the live size/mtime seen then
+        (a stat per file, no reads); used before reusing a cached plan."""
+        for rel, (size, mtime_ns) in self.unchanged.items():
+            try:
+                st = (home / rel).stat()
+            except OSError:
+                return False
+            if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                return False
+        return True
+
+
+class _AmbiguousFile(NamedTuple):
+    """Same size but different mtime than the backup: decided by hashing."""
+    rel: Path
+    stored: Path
+    entry: dict | None
+    live: os.stat_result
+
+
+def diff_backup_tree(backup_dir: Path, sub: str, home: Path) -> TreeDiff:
+    """Compare backup_dir/<sub> with home without reading file contents where possible.
+    Backup side: manifest.jsonl entry (hash, size, mtime_ns), else the stored file's stat.
+    Live side: a size mismatch means changed, equal size and mtime means unchanged; only the
+    remaining ambiguous files are hashed (in parallel) and checked against the stored hash."""
+    diff = TreeDiff()
+    root = backup_dir / sub
+    if not root.is_dir():
+        return diff
+    manifest = load_manifest(backup_dir)
+    ambiguous: list[_AmbiguousFile] = []
+    for e in _scan_files(root):
+        rel = Path(e.path).relative_to(root)
+        entry = manifest.get(f"{sub}/{rel.as_posix()}")
+        try:
+            if entry is not None:
+                size, mtime_ns = entry["size"], entry["mtime_ns"]
+            else:
+                st = e.stat()
+                size, mtime_ns = st.st_size, st.st_mtime_ns
+        except (OSError, KeyError):
+            continue
+        try:
+            live = (home / rel).stat()
+        except OSError:
+            diff.new.append(rel)
+            diff.sizes[rel] = size
+            continue
+        if live.st_size != size:
+            diff.changed.append(rel)
+            diff.sizes[rel] = size
+        elif live.st_mtime_ns != mtime_ns:
+            ambiguous.append(_AmbiguousFile(rel, Path(e.path), entry, live))
+        else:
+            diff.unchanged[rel] = (live.st_size, live.st_mtime_ns)
+
+    def differs(item: _AmbiguousFile) -> bool:
+        try:
+            expected = item.entry["hash"] if item.entry and item.entry.get("hash") else _hash_file(item.stored)
+            return _hash_file(home / item.rel) != expected
+        except OSError:
+            return True
+
+    if ambiguous:
+        with ThreadPoolExecutor(max_workers=COPY_JOBS) as pool:
+            for item, changed in zip(ambiguous, pool.map(differs, ambiguous)):
+                if changed:
+                    diff.changed.append(item.rel)
+                    diff.sizes[item.rel] = item.live.st_size
+                else:
+                    diff.unchanged[item.rel] = (item.live.st_size, item.live.st_mtime_ns)
+        diff.hashed = len(ambiguous)
+    diff.new.sort()
+    diff.changed.sort()
+    return diff
+
+
+PLAN_CACHE_TTL = 300  # seconds a computed restore plan is reused by preview/dry-run/restore
+PLAN_CACHE_VERSION = 2
+
+
+@dataclass
+class RestorePlan:
+    """Everything preview, dry-run and restore need to know about one backup vs this machine.
+    Built once by RestorePlan.build and cached on disk for PLAN_CACHE_TTL seconds, so running
+    preview, then dry-run, then restore computes the package and extra-* diffs once. A cached
+    plan is only reused while the backup files, the installed package/flatpak databases and the
+    live stats of identical files match."""
+    backup_dir: Path
+    scope: set[str]
+    profile: str
+    knsv: Path | None
+    pm: str
+    pkg_desired: list[str] = field(default_factory=list)
+    pkg_install: list[str] = field(default_factory=list)
+    pkg_remove: list[str] = field(default_factory=list)
+    fp_desired: dict[str, str] = field(default_factory=dict)   # ref -> remote
+    fp_install: dict[str, str] = field(default_factory=dict)
+    fp_remove: list[str] = field(default_factory=list)
+    trees: dict[str, TreeDiff] = field(default_factory=dict)   # in-scope extra-config / extra-data
+    pkg_sizes: dict[str, tuple[int, int]] | None = None         # filled on demand by dry-run
+    created: float = 0.0
+    cached: bool = False
+    inventory: dict[str, list | None] = field(default_factory=dict)  # package db fingerprints at build time
+
+    @staticmethod
+    def _cache_path(backup_dir: Path, scope: set[str]) -> Path:
+        key = hashlib.blake2b(f"{backup_dir.resolve()}|{','.join(sorted(scope))}".encode(), digest_size=12)
+        return inventory_cache_dir() / "plans" / f"{key.hexdigest()}.json"
+
+    @staticmethod
+    def _source_stamp(backup_dir: Path) -> list:
+        stamp = []
+        for name in ("meta.json", MANIFEST_NAME, "packages.txt", "flatpaks.txt"):
+            try:
+                stamp.append((backup_dir / name).stat().st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    @staticmethod
+    def _inventory_stamp(pm: str, scope: set[str]) -> dict[str, list | None]:
+        """Inventory cache fingerprints (package db mtimes) of the parts the plan diffs against."""
+        stamp: dict[str, list | None] = {}
+        if "packages" in scope:
+            stamp["packages"] = _sources_fingerprint(_package_db_sources(pm))
+        if "flatpak" in scope:
+            stamp["flatpak"] = _sources_fingerprint(_flatpak_sources())
+        return stamp
+
+    def inventory_unchanged(self) -> bool:
+        # No flatpak installation dir is a state like any other (creating one changes the
+        # fingerprint); no package db (unknown package manager) means a change cannot be ruled out
+        current = self._inventory_stamp(self.pm, self.scope)
+        return current == self.inventory and current.get("packages", []) is not None
+
+    @classmethod
+    def build(cls, backup_dir: Path, scope_override: set[str] | None = None) -> "RestorePlan":
+        meta = load_meta(backup_dir)
+        scope = effective_scope(meta, scope_override)
+        home = Path.home()
+        cached = cls._load(backup_dir, scope)
+        if (cached is not None and cached.inventory_unchanged()
+                and all(t.still_valid(home) for t in cached.trees.values())):
+            print(f"[i] {int(time.time() - cached.created)} sn önce hesaplanan restore planı kullanılıyor.")
+            return cached
+        plan = cls(backup_dir=backup_dir, scope=scope, profile=meta.get("profile") or DEFAULT_PROFILE,
+                   knsv=_find_knsv(backup_dir), pm=detect_pkg_manager(), created=time.time())
+        # taken before reading the inventory: a change during the build leaves the plan stale
+        plan.inventory = cls._inventory_stamp(plan.pm, scope)
+        if "packages" in scope:
+            plan.pkg_desired = sorted(set(_list_lines(backup_dir / "packages.txt")))
+            if plan.pkg_desired:
+                current = set(cached_installed_packages(plan.pm))
+                plan.pkg_install = sorted(set(plan.pkg_desired) - current)
+                plan.pkg_remove = sorted(current - set(plan.pkg_desired))
+        if "flatpak" in scope:
+            plan.fp_desired = read_flatpak_list(backup_dir / "flatpaks.txt")
+            if plan.fp_desired:
+                current_fp = set(parse_flatpak_lines(cached_flatpaks()))
+                plan.fp_install = {r: o for r, o in plan.fp_desired.items() if r not in current_fp}
+                plan.fp_remove = sorted(current_fp - set(plan.fp_desired))
+        for sub, key in (("extra-config", "extra_config"), ("extra-data", "extra_data")):
+            if key in scope and (backup_dir / sub).is_dir():
+                plan.trees[sub] = diff_backup_tree(backup_dir, sub, home)
+        plan.save()
+        return plan
+
+    @classmethod
+    def _load(cls, backup_dir: Path, scope: set[str]) -> "RestorePlan | None":
+        try:
+            d = json.loads(read_text(cls._cache_path(backup_dir, scope)))
+            if (d.get("version") != PLAN_CACHE_VERSION or time.time() - d["created"] > PLAN_CACHE_TTL
+                    or d["stamp"] != cls._source_stamp(backup_dir)):
+                return None
+            return cls(
+                backup_dir=backup_dir, scope=set(d["scope"]), profile=d["profile"],
+                knsv=Path(d["knsv"]) if d["knsv"] else None, pm=d["pm"],
+                pkg_desired=d["pkg_desired"], pkg_install=d["pkg_install"], pkg_remove=d["pkg_remove"],
+                fp_desired=d["fp_desired"], fp_install=d["fp_install"], fp_remove=d["fp_remove"],
+                trees={k: TreeDiff.from_json(v) for k, v in d["trees"].items()},
+                pkg_sizes={k: (v[0], v[1]) for k, v in d["pkg_sizes"].items()} if d["pkg_sizes"] is not None else None,
+                created=d["created"], cached=True, inventory=d["inventory"],
+            )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def save(self):
+        path = self._cache_path(self.backup_dir, self.scope)
+        d = {
+            "version": PLAN_CACHE_VERSION, "created": self.created, "stamp": self._source_stamp(self.backup_dir),
+            "scope": sorted(self.scope), "profile": self.profile, "knsv": str(self.knsv) if self.knsv else None,
+            "pm": self.pm, "pkg_desired": self.pkg_desired, "pkg_install": self.pkg_install,
+            "pkg_remove": self.pkg_remove, "fp_desired": self.fp_desired, "fp_install": self.fp_install,
+            "fp_remove": self.fp_remove, "trees": {k: v.to_json() for k, v in self.trees.items()},
+            "pkg_sizes": self.pkg_sizes, "inventory": self.inventory,
+        }
+        try:
+            ensure_dir(path.parent)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            write_text(tmp, json.dumps(d, ensure_ascii=False))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # cache is best-effort
+
+    def package_sizes(self) -> dict[str, tuple[int, int]]:
+        if self.pkg_sizes is None:
+            self.pkg_sizes = _estimate_pkg_sizes(self.pm, self.pkg_install)
+            self.save()
+        return self.pkg_sizes
+
+    def invalidate(self):
+        try:
+            self._cache_path(self.backup_dir, self.scope).unlink()
+        except OSError:
+            pass
+
+
 def _diff_sets(desired: set[str], current: set[str]) -> tuple[set[str], set[str]]:
     to_install = desired - current
     missing = desired - current
@@ -781,112 +2641,104 @@ def _diff_sets(desired: set[str], current: set[str]) -> tuple[set[str], set[str]
     return to_install, to_remove
 
 
+def _report_missing(command: str, message: str):
+    print(message)
+    if RECORDS is not None:
+        RECORDS.emit(command, "error", message=message.removeprefix("[!] "))
+
+
+def _flatpak_recorded_sizes(backup_dir: Path) -> dict[str, int]:
+    """Installed size per ref as recorded in system-packages.json at backup time."""
+    try:
+        details = json.loads(read_text(backup_dir / "system-packages.json")).get("flatpak-details", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+    return {r: d.get("installed_size", 0) for r, d in details.items() if isinstance(d, dict)}
+
+
+def _emit_plan(command: str, plan: RestorePlan, with_sizes: bool = False):
+    """Stream a restore plan as records: every package, flatpak and file, untruncated."""
+    def emit(kind: str, **fields):
+        RECORDS.emit(command, kind, **fields)
+
+    emit("backup", path=str(plan.backup_dir), scope=sorted(plan.scope))
+    if "konsave" in plan.scope:
+        emit("konsave", file=plan.knsv.name if plan.knsv else None, profile=plan.profile)
+    sizes = plan.package_sizes() if with_sizes and plan.pkg_install else {}
+    for name in plan.pkg_install:
+        rec = {"name": name, "action": "install"}
+        if name in sizes:
+            rec["download_size"], rec["installed_size"] = sizes[name]
+        emit("package", **rec)
+    for name in plan.pkg_remove:
+        emit("package", name=name, action="remove")
+    fp_sizes = _flatpak_recorded_sizes(plan.backup_dir) if with_sizes else {}
+    for ref, remote in sorted(plan.fp_install.items()):
+        rec = {"ref": ref, "remote": remote or None, "action": "install"}
+        if ref in fp_sizes:
+            rec["installed_size"] = fp_sizes[ref]
+        emit("flatpak", **rec)
+    for ref in plan.fp_remove:
+        emit("flatpak", ref=ref, remote=None, action="remove")
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    for sub, diff in plan.trees.items():
+        new = set(diff.new)
+        for rel in sorted(diff.new + diff.changed):
+            emit("file", tree=sub, path=rel.as_posix(), change="+" if rel in new else "~", size=diff.sizes.get(rel, 0))
+        for rel in sorted(diff.unchanged):
+            emit("file", tree=sub, path=rel.as_posix(), change="=", size=diff.unchanged[rel][0])
+        counts["new"] += len(diff.new)
+        counts["changed"] += len(diff.changed)
+        counts["unchanged"] += len(diff.unchanged)
+    summary = {"packages_install": len(plan.pkg_install), "packages_remove": len(plan.pkg_remove),
+               "flatpaks_install": len(plan.fp_install), "flatpaks_remove": len(plan.fp_remove),
+               "files_new": counts["new"], "files_changed": counts["changed"], "files_unchanged": counts["unchanged"]}
+    if with_sizes:
+        summary["download_size"] = sum(d for d, _ in sizes.values())
+        summary["installed_size"] = sum(i for _, i in sizes.values()) + sum(fp_sizes.get(r, 0) for r in plan.fp_install)
+    emit("summary", **summary)
+
+
 def do_preview(target: str | None = None, scope_override: set[str] | None = None, tag: str | None = None):
     """Show what would change if restore is run for the selected backup.
     target: 'latest' or a timestamp prefix (e.g., 20250829-151354)."""
-    # Resolve backup dir
-    if target is None and not tag:
-        backup_dir = pick_backup_dir()
-    else:
-        if target == "latest":
-            backup_dir = BACKUP_ROOT / "latest"
-        else:
-            backup_dir = None
-            if tag:
-                backup_dir = find_backup_by_tag(tag)
-            elif target:
-                cands = sorted([p for p in BACKUP_ROOT.iterdir() if p.is_dir() and p.name.startswith(target)])
-                backup_dir = cands[-1] if cands else None
+    backup_dir = _resolve_backup_selector(target, tag)
     if not backup_dir or not backup_dir.exists():
-        print("[!] Önizleme için yedek bulunamadı.")
+        _report_missing("preview", "[!] Önizleme için yedek bulunamadı.")
         return
 
     print(f"[i] Önizleme için yedek: {backup_dir}")
-    meta = load_meta(backup_dir)
-    scope = effective_scope(meta, scope_override)
-
-    # Packages diff (scope)
-    pkg_file = backup_dir / "packages.txt"
-    desired_pkgs = set(_list_lines(pkg_file))
-    current_pkgs = set(list_installed_packages(detect_pkg_manager())) if desired_pkgs and ("packages" in scope) else set()
-    to_install = desired_pkgs - current_pkgs
-    to_remove = current_pkgs - desired_pkgs if desired_pkgs else set()
-
-    # Flatpaks diff (scope)
-    fp_file = backup_dir / "flatpaks.txt"
-    desired_fp = set(_list_lines(fp_file))
-    current_fp = set(list_flatpaks()) if desired_fp and ("flatpak" in scope) else set()
-    fp_install = desired_fp - current_fp
-    fp_remove = current_fp - desired_fp if desired_fp else set()
-
-    # extra-config
-    base = Path.home()
-    xc_root = backup_dir / "extra-config"
-    xc_new: list[Path] = []
-    xc_change: list[Path] = []
-    if xc_root.exists():
-        for f in sorted(xc_root.rglob("*")):
-            if f.is_file():
-                rel = f.relative_to(xc_root)
-                dest = base / rel
-                if not dest.exists():
-                    xc_new.append(rel)
-                else:
-                    same = filecmp.cmp(f, dest, shallow=False)
-                    if not same:
-                        xc_change.append(rel)
-
-    # extra-data
-    xd_root = backup_dir / "extra-data"
-    xd_new: list[Path] = []
-    xd_change: list[Path] = []
-    if xd_root.exists():
-        for f in sorted(xd_root.rglob("*")):
-            if f.is_file():
-                rel = f.relative_to(xd_root)
-                dest = base / rel
-                if not dest.exists():
-                    xd_new.append(rel)
-                else:
-                    same = filecmp.cmp(f, dest, shallow=False)
-                    if not same:
-                        xd_change.append(rel)
-
-    # .knsv summary
-    knsv = _find_knsv(backup_dir)
+    plan = RestorePlan.build(backup_dir, scope_override)
+    scope = plan.scope
+    if RECORDS is not None:
+        _emit_plan("preview", plan)
+        return
 
     def _sample(items: list, n: int = 8):
         return [str(x) for x in items[:n]]
 
     print("\n[Preview]")
     # Konsave
-    if knsv and ("konsave" in scope):
-        print(f"  • Konsave profili uygulanacak: {knsv.name}")
+    if plan.knsv and ("konsave" in scope):
+        print(f"  • Konsave profili uygulanacak: {plan.knsv.name}")
     else:
         print("  • Konsave uygulanmayacak veya profil yok.")
     # Packages
-    if desired_pkgs and ("packages" in scope):
-        print(f"  • Paketler: kurulacak {len(to_install)}, (isteğe bağlı) kaldırılabilir {len(to_remove)}")
-        if to_install:
-            print("    Örnek (install):", ", ".join(sorted(list(to_install))[:8]))
+    if plan.pkg_desired:
+        print(f"  • Paketler: kurulacak {len(plan.pkg_install)}, (isteğe bağlı) kaldırılabilir {len(plan.pkg_remove)}")
+        if plan.pkg_install:
+            print("    Örnek (install):", ", ".join(plan.pkg_install[:8]))
     # Flatpaks
-    if desired_fp and ("flatpak" in scope):
-        print(f"  • Flatpak: kurulacak {len(fp_install)}, (isteğe bağlı) kaldırılabilir {len(fp_remove)}")
-        if fp_install:
-            print("    Örnek (install):", ", ".join(sorted(list(fp_install))[:8]))
-    # Extra-config
-    if xc_root.exists() and ("extra_config" in scope):
-        print(f"  • extra-config: yeni {len(xc_new)}, üzerine yazılacak {len(xc_change)} (silme yapılmaz)")
-        for s in _sample(xc_new):
-            print(f"    + {s}")
-        for s in _sample(xc_change):
-            print(f"    ~ {s}")
-    # Extra-data
-    if xd_root.exists() and ("extra_data" in scope):
-        print(f"  • extra-data: yeni {len(xd_new)}, üzerine yazılacak {len(xd_change)} (silme yapılmaz)")
-        for s in _sample(xd_new):
+    if plan.fp_desired:
+        print(f"  • Flatpak: kurulacak {len(plan.fp_install)}, (isteğe bağlı) kaldırılabilir {len(plan.fp_remove)}")
+        if plan.fp_install:
+            print("    Örnek (install):", ", ".join(sorted(plan.fp_install)[:8]))
+    # Extra-config / extra-data
+    for sub, diff in plan.trees.items():
+        print(f"  • {sub}: yeni {len(diff.new)}, üzerine yazılacak {len(diff.changed)} (silme yapılmaz)")
+        for s in _sample(diff.new):
             print(f"    + {s}")
-        for s in _sample(xd_change):
+        for s in _sample(diff.changed):
             print(f"    ~ {s}")
     print("\nNot: Restore, extra-* için dosya KOPYALAR; mevcut fazladan dosyaları silmez.")
 
@@ -901,135 +2753,148 @@ def _human_size(n: int) -> str:
     return f"{s:.1f} PB"
 
 
-def _estimate_pkg_sizes(pm: str, packages: list[str], sample: int = 12) -> tuple[int, int]:
-    """Best-effort rough size estimate (bytes) using package manager info for a small sample.
-    Returns (sample_total, estimated_total) where estimated extrapolates to full set.
-    If not available, returns (0, 0)."""
-    pkgs = packages[:sample]
-    if not pkgs:
-        return 0, 0
-    total = 0
-    def parse_size(out: str) -> int:
-        # Try to find numeric bytes in output lines like "Size : 12 M" or "Installed-Size: 3456 kB"
-        m = re.search(r"(Installed-Size|Size)\s*[:=]?\s*([0-9]+)\s*(kB|KB|MB|GB)?", out, re.IGNORECASE)
-        if not m:
-            return 0
-        val = int(m.group(2))
-        unit = (m.group(3) or "B").upper()
-        if unit in {"KB", "KB"}:
-            return val * 1024
-        if unit == "MB":
-            return val * 1024 * 1024
-        if unit == "GB":
-            return val * 1024 * 1024 * 1024
-        # Some managers report in kB textually lowercase
-        if unit == "KB":
-            return val * 1024
-        return val
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "KIB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2,
+               "MIB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3, "GIB": 1024 ** 3}
+
+
+def _parse_size_value(value: str) -> int:
+    """'183.67 KiB' / '1.5 M' / '4096' -> bytes (0 if unparsable)."""
+    m = re.match(r"\s*([0-9]+(?:[.,][0-9]+)?)\s*([A-Za-z]*)", value)
+    if not m:
+        return 0
+    mult = _SIZE_UNITS.get(m.group(2).upper())
+    if mult is None:
+        return 0
+    return int(float(m.group(1).replace(",", ".")) * mult)
+
+
+def _info_blocks(out: str, name_key: str):
+    """Split `Key : value` style info output (pacman -Si, zypper info) into dicts per package."""
+    block: dict[str, str] = {}
+    for line in out.splitlines():
+        key, sep, value = line.partition(":")
+        if not sep or line[:1].isspace():
+            continue
+        key = key.strip()
+        if key == name_key and block:
+            yield block
+            block = {}
+        block[key] = value.strip()
+    if block:
+        yield block
+
+
+def _estimate_pkg_sizes(pm: str, packages: list[str]) -> dict[str, tuple[int, int]]:
+    """Download and installed size (bytes) per package, resolved with one query for the
+    whole set. Packages the manager does not know are missing from the result."""
+    if not packages:
+        return {}
+    sizes: dict[str, tuple[int, int]] = {}
+    env = {**os.environ, "LC_ALL": "C"}
     try:
-        for p in pkgs:
-            if pm in {"dnf", "rpm"}:
-                r = run(["bash", "-lc", f"dnf info {shlex.quote(p)} 2>/dev/null || rpm -qi {shlex.quote(p)} 2>/dev/null"], check=False)
-                total += parse_size(r.stdout)
-            elif pm == "apt":
-                r = run(["bash", "-lc", f"apt show {shlex.quote(p)} 2>/dev/null || apt-cache show {shlex.quote(p)} 2>/dev/null"], check=False)
-                total += parse_size(r.stdout)
-            elif pm == "pacman":
-                r = run(["bash", "-lc", f"pacman -Si {shlex.quote(p)} 2>/dev/null"], check=False)
-                total += parse_size(r.stdout)
-            elif pm == "zypper":
-                r = run(["bash", "-lc", f"zypper info {shlex.quote(p)} 2>/dev/null"], check=False)
-                total += parse_size(r.stdout)
-    except (subprocess.CalledProcessError, OSError, ValueError):
-        return 0, 0
-    est = int(total * (len(packages) / max(1, len(pkgs))))
-    return total, est
+        if pm in {"dnf", "rpm"}:
+            if which("dnf"):
+                # dnf4 query tags; dnf5 does not know them and prints nothing usable
+                r = run(["dnf", "-q", "repoquery", "--latest-limit=1",
+                         "--qf", "%{name}\t%{downloadsize}\t%{installsize}\n", *packages], check=False, env=env)
+                for line in r.stdout.splitlines():
+                    parts = line.split("\t")
+                    if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+                        sizes.setdefault(parts[0], (int(parts[1]), int(parts[2])))
+            missing = [p for p in packages if p not in sizes]
+            if missing and which("rpm"):
+                # Installed packages only (no download size); "not installed" lines are skipped
+                r = run(["rpm", "-q", "--qf", "%{NAME}\t%{SIZE}\n", *missing], check=False, env=env)
+                for line in r.stdout.splitlines():
+                    parts = line.split("\t")
+                    if len(parts) == 2 and parts[1].isdigit():
+                        sizes.setdefault(parts[0], (0, int(parts[1])))
+        elif pm == "apt" and which("apt-cache"):
+            r = run(["apt-cache", "show", "--no-all-versions", *packages], check=False, env=env)
+            for st in _parse_deb822(r.stdout):
+                if "Package" in st:
+                    # Size is bytes, Installed-Size is KiB
+                    sizes.setdefault(st["Package"], (int(st.get("Size", "0") or 0),
+                                                     int(st.get("Installed-Size", "0") or 0) * 1024))
+        elif pm == "pacman" and which("pacman"):
+            r = run(["pacman", "-Si", *packages], check=False, env=env)
+            for b in _info_blocks(r.stdout, "Repository"):
+                if "Name" in b:
+                    sizes.setdefault(b["Name"], (_parse_size_value(b.get("Download Size", "")),
+                                                 _parse_size_value(b.get("Installed Size", ""))))
+        elif pm == "zypper" and which("zypper"):
+            # zypper info has no download size
+            r = run(["zypper", "--no-refresh", "info", *packages], check=False, env=env)
+            for b in _info_blocks(r.stdout, "Repository"):
+                if "Name" in b:
+                    sizes.setdefault(b["Name"], (0, _parse_size_value(b.get("Installed Size", ""))))
+    except (OSError, ValueError):
+        return {}
+    wanted = set(packages)
+    return {k: v for k, v in sizes.items() if k in wanted}
 
 
 def do_restore_dry_run(target: str | None = None, scope_override: set[str] | None = None, tag: str | None = None):
-    """Simulate restore actions with rsync-like output and rough size estimates."""
-    # Reuse preview to compute diffs
-    # Resolve backup dir
-    if target is None and not tag:
-        backup_dir = pick_backup_dir()
-    else:
-        if target == "latest":
-            backup_dir = BACKUP_ROOT / "latest"
-        else:
-            backup_dir = None
-            if tag:
-                backup_dir = find_backup_by_tag(tag)
-            elif target:
-                cands = sorted([p for p in BACKUP_ROOT.iterdir() if p.is_dir() and p.name.startswith(target)])
-                backup_dir = cands[-1] if cands else None
+    """Simulate restore actions with rsync-like output and package size totals."""
+    backup_dir = _resolve_backup_selector(target, tag)
     if not backup_dir or not backup_dir.exists():
-        print("[!] Dry-run için yedek bulunamadı.")
+        _report_missing("dry-run", "[!] Dry-run için yedek bulunamadı.")
         return
 
     print(f"[i] Dry-run için yedek: {backup_dir}")
-    meta = load_meta(backup_dir)
-    scope = effective_scope(meta, scope_override)
+    plan = RestorePlan.build(backup_dir, scope_override)
+    scope = plan.scope
+    if RECORDS is not None:
+        _emit_plan("dry-run", plan, with_sizes=True)
+        return
 
     # Konsave
-    knsv = _find_knsv(backup_dir)
     if "konsave" in scope:
-        if knsv:
-            print(f"[DRY] konsave -i {knsv.name} && konsave -a {meta.get('profile') or DEFAULT_PROFILE}")
+        if plan.knsv:
+            print(f"[DRY] konsave -i {plan.knsv.name} && konsave -a {plan.profile}")
         else:
             print("[DRY] .knsv yok -> konsave adımı atlanır")
 
     # Packages
-    if "packages" in scope:
-        pm = detect_pkg_manager()
-        desired = set(_list_lines(backup_dir / "packages.txt"))
-        current = set(list_installed_packages(pm)) if desired else set()
-        to_install = sorted(desired - current)
-        if to_install:
-            sample, est = _estimate_pkg_sizes(pm, to_install)
-            note = f" (tahmini boyut ~{_human_size(est)})" if est else ""
-            print(f"[DRY] Paket kurulumu: {len(to_install)} paket{note}")
-            if pm in {"dnf", "rpm"}:
-                print("      sudo dnf install -y ", " ".join(shlex.quote(x) for x in to_install[:15]), (" ..." if len(to_install) > 15 else ""))
-            elif pm == "apt":
-                print("      sudo apt install -y ", " ".join(shlex.quote(x) for x in to_install[:15]), (" ..." if len(to_install) > 15 else ""))
-            elif pm == "pacman":
-                print("      sudo pacman -S --needed ", " ".join(shlex.quote(x) for x in to_install[:15]), (" ..." if len(to_install) > 15 else ""))
-            elif pm == "zypper":
-                print("      sudo zypper install -y ", " ".join(shlex.quote(x) for x in to_install[:15]), (" ..." if len(to_install) > 15 else ""))
+    to_install = plan.pkg_install
+    if to_install:
+        sizes = plan.package_sizes()
+        note = ""
+        if sizes:
+            dl = sum(d for d, _ in sizes.values())
+            inst = sum(i for _, i in sizes.values())
+            unknown = len(to_install) - len(sizes)
+            note = f" (indirme {_human_size(dl)}, kurulum {_human_size(inst)}"
+            note += f"; {unknown} paketin boyutu bilinmiyor)" if unknown else ")"
+        print(f"[DRY] Paket kurulumu: {len(to_install)} paket{note}")
+        cmd = _pkg_install_command(plan.pm)
+        if cmd:
+            print(f"      {cmd} ", " ".join(shlex.quote(x) for x in to_install[:15]), (" ..." if len(to_install) > 15 else ""))
 
     # Flatpaks
-    if "flatpak" in scope:
-        desired_fp = set(_list_lines(backup_dir / "flatpaks.txt"))
-        current_fp = set(list_flatpaks()) if desired_fp else set()
-        to_install_fp = sorted(desired_fp - current_fp)
-        if to_install_fp:
-            print(f"[DRY] Flatpak kurulumu: {len(to_install_fp)} uygulama (boyut değişken, flathub'a bağlı)")
-            print("      flatpak install -y --noninteractive ", " ".join(shlex.quote(x) for x in to_install_fp[:15]), (" ..." if len(to_install_fp) > 15 else ""))
+    if plan.fp_install:
+        # installed sizes recorded at backup time, when the backup has them
+        fp_sizes = _flatpak_recorded_sizes(backup_dir)
+        known = [fp_sizes[r] for r in plan.fp_install if r in fp_sizes]
+        note = f"kurulum ~{_human_size(sum(known))}, yedekteki kayda göre" if known else "boyut değişken, remote'a bağlı"
+        print(f"[DRY] Flatpak kurulumu: {len(plan.fp_install)} uygulama ({note})")
+        for cmd in flatpak_install_commands(plan.fp_install, limit=15):
+            print("      " + cmd)
 
     # Extra-* rsync-like
-    home = Path.home()
-    for label, sub, enabled in (("extra-config", "extra-config", "extra_config" in scope), ("extra-data", "extra-data", "extra_data" in scope)):
-        root = backup_dir / sub
-        if root.exists() and enabled:
-            print(f"[DRY] rsync --dry-run {sub}/ -> ~/")
-            for f in sorted(root.rglob("*")):
-                if f.is_file():
-                    rel = f.relative_to(root)
-                    dest = home / rel
-                    sign = "+" if not dest.exists() else ("~" if not filecmp.cmp(f, dest, shallow=False) else "=")
-                    if sign != "=":
-                        try:
-                            sz = f.stat().st_size
-                        except OSError:
-                            sz = 0
-                        print(f"      {sign} {rel} ({_human_size(sz)})")
+    for sub, diff in plan.trees.items():
+        print(f"[DRY] rsync --dry-run {sub}/ -> ~/")
+        new = set(diff.new)
+        for rel in sorted(diff.new + diff.changed):
+            sign = "+" if rel in new else "~"
+            print(f"      {sign} {rel} ({_human_size(diff.sizes.get(rel, 0))})")
 
 
 def pick_backup_dir() -> Path | None:
     if not BACKUP_ROOT.exists():
         print("[!] Yedek dizini bulunamadı:", BACKUP_ROOT)
         return None
-    entries = sorted([p for p in BACKUP_ROOT.iterdir() if p.is_dir()])
+    entries = Catalog().backups()
     if not entries:
         print("[!] Hiç yedek bulunamadı.")
         return None
@@ -1048,6 +2913,119 @@ def pick_backup_dir() -> Path | None:
     print("[!] Geçersiz seçim.")
     return None
 
+# konsave export layout -> paths relative to $HOME, in one pass
+_KNSV_PREFIX = re.compile(r"^(?:export/(config|share)_folder/|home/[^/]+/)")
+_KNSV_PREFIX_MAP = {"config": ".config/", "share": ".local/share/", None: ""}
+COLORIZER_HINT = re.compile(r"colorizer|panel.*color", re.IGNORECASE)
+# (id, pattern on the normalized name, label); colorizer is matched on the raw name
+KNSV_CHECKS = [
+    ("panel_layout", re.compile(r"\.config/plasma-org\.kde\.plasma\.desktop-appletsrc$"),
+     "Panel yerleşimi: ~/.config/plasma-org.kde.plasma.desktop-appletsrc"),
+    ("kdeglobals", re.compile(r"\.config/kdeglobals$"), "Genel KDE: ~/.config/kdeglobals"),
+    ("kwinrc", re.compile(r"\.config/kwinrc$"), "KWin: ~/.config/kwinrc"),
+    ("plasmoids", re.compile(r"^\.local/share/plasma/plasmoids/"), "Plasmoid dizinleri: ~/.local/share/plasma/plasmoids/"),
+    ("look_and_feel", re.compile(r"^\.local/share/plasma/look-and-feel"), "Look-and-feel: ~/.local/share/plasma/look-and-feel/"),
+    ("icons", re.compile(r"^\.local/share/icons"), "Icon themes: ~/.local/share/icons/"),
+    ("color_schemes", re.compile(r"^\.local/share/color-schemes"), "Color schemes: ~/.local/share/color-schemes/"),
+    ("aurorae", re.compile(r"^\.local/share/aurorae"), "Aurorae: ~/.local/share/aurorae/"),
+    ("konsole", re.compile(r"^\.local/share/konsole"), "Konsole profilleri: ~/.local/share/konsole/"),
+    ("colorizer", COLORIZER_HINT, "Panel Colorizer ile ilişkili girdiler"),
+]
+
+
+def _normalize_knsv_name(name: str) -> str:
+    return _KNSV_PREFIX.sub(lambda m: _KNSV_PREFIX_MAP[m.group(1)], name, count=1)
+
+
+def knsv_format(knsv: Path) -> str | None:
+    """'zip' or 'tar' (any compression), None when unrecognized. Only headers are read."""
+    if zipfile.is_zipfile(knsv):
+        return "zip"
+    if tarfile.is_tarfile(knsv):
+        return "tar"
+    return None
+
+
+def iter_knsv_members(knsv: Path, fmt: str | None = None):
+    """Yield member names of a .knsv as they are read.
+    zip names come from the central directory without decompressing anything; tar is read
+    as a stream (r|*), so a caller that stops iterating never decompresses the rest."""
+    fmt = fmt or knsv_format(knsv)
+    if fmt == "zip":
+        with zipfile.ZipFile(knsv, "r") as zf:
+            for info in zf.infolist():
+                yield info.filename
+    elif fmt == "tar":
+        with tarfile.open(knsv, "r|*") as tf:
+            for member in tf:
+                yield member.name
+
+
+# Sidecar <name>.knsv.index.json: [name, size, crc32] per member plus the size/mtime of the
+# archive it describes, so compare/verify read a small JSON file instead of the archive.
+KNSV_INDEX_SUFFIX = ".index.json"
+KNSV_INDEX_VERSION = 1
+
+
+def _knsv_index_path(knsv: Path) -> Path:
+    return knsv.with_name(knsv.name + KNSV_INDEX_SUFFIX)
+
+
+def _scan_knsv_members(knsv: Path, fmt: str | None) -> list[list]:
+    """[name, size, crc32] for every member (crc is None for directories). zip CRCs come from
+    the central directory; tar members are read once as a stream to compute theirs."""
+    members: list[list] = []
+    if fmt == "zip":
+        with zipfile.ZipFile(knsv, "r") as zf:
+            for info in zf.infolist():
+                members.append([info.filename, info.file_size, None if info.is_dir() else info.CRC])
+    elif fmt == "tar":
+        with tarfile.open(knsv, "r|*") as tf:
+            for member in tf:
+                crc = None
+                if member.isfile():
+                    crc = 0
+                    f = tf.extractfile(member)
+                    for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                        crc = zlib.crc32(chunk, crc)
+                members.append([member.name, member.size, crc])
+    return members
+
+
+def load_knsv_index(knsv: Path) -> list[list] | None:
+    """Members from the sidecar index, or None when it is missing or the archive changed."""
+    try:
+        st = knsv.stat()
+        data = json.loads(_knsv_index_path(knsv).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(data, dict) or data.get("version") != KNSV_INDEX_VERSION
+            or data.get("size") != st.st_size or data.get("mtime_ns") != st.st_mtime_ns):
+        return None
+    return data.get("members")
+
+
+def knsv_index(knsv: Path, fmt: str | None = None) -> list[list]:
+    """Member index of a .knsv, (re)built and saved next to it when the sidecar is stale."""
+    members = load_knsv_index(knsv)
+    if members is not None:
+        return members
+    st = knsv.stat()  # before reading: a rewrite during the scan leaves the index stale
+    fmt = fmt or knsv_format(knsv)
+    members = _scan_knsv_members(knsv, fmt)
+    if fmt is None:
+        return members
+    path = _knsv_index_path(knsv)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        tmp.write_text(json.dumps({"version": KNSV_INDEX_VERSION, "size": st.st_size,
+                                   "mtime_ns": st.st_mtime_ns, "members": members}), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only backup dir: the index is only an optimization
+    return members
+
+
 def verify_backup(target: str | None = None, tag: str | None = None):
     """Inspect .knsv contents and report presence of core KDE items."""
     # Resolve backup dir
@@ -1061,89 +3039,327 @@ def verify_backup(target: str | None = None, tag: str | None = None):
             if tag:
                 backup_dir = find_backup_by_tag(tag)
             elif target:
-                cands = sorted([p for p in BACKUP_ROOT.iterdir() if p.is_dir() and p.name.startswith(target)])
-                backup_dir = cands[-1] if cands else None
+                backup_dir = find_backup_by_prefix(target)
     if not backup_dir or not backup_dir.exists():
-        print("[!] Verify için yedek bulunamadı.")
+        _report_missing("verify", "[!] Verify için yedek bulunamadı.")
         return
 
     knsv = _find_knsv(backup_dir)
     if not knsv:
-        print("[!] .knsv bulunamadı.")
+        _report_missing("verify", "[!] .knsv bulunamadı.")
         return
+    if RECORDS is not None:
+        RECORDS.emit("verify", "backup", path=str(backup_dir), knsv=knsv.name)
 
-    wanted_files_suffix = [
-        ".config/plasma-org.kde.plasma.desktop-appletsrc",
-        ".config/kdeglobals",
-        ".config/kwinrc",
-    ]
-    wanted_dirs_prefix = [
-        ".local/share/plasma/plasmoids/",
-        ".local/share/plasma/look-and-feel",
-        ".local/share/icons",
-        ".local/share/color-schemes",
-        ".local/share/aurorae",
-        ".local/share/konsole",
-    ]
-    colorizer_hints = [r"colorizer", r"panel.*color", r"Colorizer"]
-
-    found_files = {s: False for s in wanted_files_suffix}
-    found_dirs = {p: False for p in wanted_dirs_prefix}
-    found_colorizer = False
-    sample_hits: list[str] = []
-
+    found = {check_id: False for check_id, _, _ in KNSV_CHECKS}
+    # machine output lists every colorizer entry, so only text mode can stop early
+    stop_early = RECORDS is None
     try:
-        names: list[str] = []
-        if tarfile.is_tarfile(knsv):
-            with tarfile.open(knsv, "r:*") as tf:
-                names = tf.getnames()
-        elif zipfile.is_zipfile(knsv):
-            with zipfile.ZipFile(knsv, "r") as zf:
-                names = zf.namelist()
-        else:
-            print("[!] Arşiv biçimi tanınmadı (ne tar ne zip).")
-            return
-
-        def normalize(path: str) -> str:
-            path = re.sub(r"^export/config_folder/", ".config/", path)
-            path = re.sub(r"^export/share_folder/", ".local/share/", path)
-            path = re.sub(r"^home/[^/]+/", "", path)
-            return path
-
+        members = load_knsv_index(knsv)
+        if members is None:
+            fmt = knsv_format(knsv)
+            if fmt is None:
+                _report_missing("verify", "[!] Arşiv biçimi tanınmadı (ne tar ne zip).")
+                return
+            if fmt == "zip":
+                members = knsv_index(knsv, fmt)  # central directory only: as cheap as listing
+        names = (m[0] for m in members) if members is not None else iter_knsv_members(knsv, fmt)
         for name in names:
-            n = normalize(name)
-            for suf in wanted_files_suffix:
-                if n.endswith(suf):
-                    found_files[suf] = True
-            for pref in wanted_dirs_prefix:
-                if n.startswith(pref):
-                    found_dirs[pref] = True
-            if not found_colorizer:
-                for hint in colorizer_hints:
-                    if re.search(hint, name, flags=re.IGNORECASE):
-                        found_colorizer = True
-                        if len(sample_hits) < 10:
-                            sample_hits.append(name)
-                        break
-    except (tarfile.TarError, zipfile.BadZipFile, OSError) as e:
-        print(f"[!] Arşiv okunamadı: {e}")
+            n = _normalize_knsv_name(name)
+            for check_id, pattern, _ in KNSV_CHECKS[:-1]:
+                if not found[check_id] and pattern.search(n):
+                    found[check_id] = True
+            if (not found["colorizer"] or not stop_early) and COLORIZER_HINT.search(name):
+                found["colorizer"] = True
+                if RECORDS is not None:
+                    RECORDS.emit("verify", "hint", check="colorizer", entry=name)
+            if stop_early and all(found.values()):
+                break
+    except (tarfile.TarError, zipfile.BadZipFile, OSError, EOFError) as e:
+        _report_missing("verify", f"[!] Arşiv okunamadı: {e}")
+        return
+
+    checks = [(check_id, found[check_id], label) for check_id, _, label in KNSV_CHECKS]
+    if RECORDS is not None:
+        for check_id, hit, label in checks:
+            RECORDS.emit("verify", "check", id=check_id, name=label, ok=hit)
+        RECORDS.emit("verify", "summary", passed=sum(1 for _, f, _ in checks if f), total=len(checks))
         return
 
     print("\n[Verify]")
     def ok(b: bool) -> str:
         return "✓" if b else "✗"
-    print(f"  {ok(found_files[wanted_files_suffix[0]])} Panel yerleşimi: ~/.config/plasma-org.kde.plasma.desktop-appletsrc")
-    print(f"  {ok(found_files[wanted_files_suffix[1]])} Genel KDE: ~/.config/kdeglobals")
-    print(f"  {ok(found_files[wanted_files_suffix[2]])} KWin: ~/.config/kwinrc")
-    print(f"  {ok(found_dirs[wanted_dirs_prefix[0]])} Plasmoid dizinleri: ~/.local/share/plasma/plasmoids/")
-    print(f"  {ok(found_dirs[wanted_dirs_prefix[1]])} Look-and-feel: ~/.local/share/plasma/look-and-feel/")
-    print(f"  {ok(found_dirs[wanted_dirs_prefix[2]])} Icon themes: ~/.local/share/icons/")
-    print(f"  {ok(found_dirs[wanted_dirs_prefix[3]])} Color schemes: ~/.local/share/color-schemes/")
-    print(f"  {ok(found_dirs[wanted_dirs_prefix[4]])} Aurorae: ~/.local/share/aurorae/")
-    print(f"  {ok(found_dirs[wanted_dirs_prefix[5]])} Konsole profilleri: ~/.local/share/konsole/")
-    print(f"  {ok(found_colorizer)} Panel Colorizer ile ilişkili girdiler")
+    for _, hit, label in checks:
+        print(f"  {ok(hit)} {label}")
+
+
+# --------------------- deep verify ---------------------
+# `verify --deep` re-reads every stored byte: tree files are re-hashed against manifest.jsonl,
+# archive backups (<ts>.tar.*) against the manifest stored inside them, zip .knsv members
+# against the CRCs in the zip itself and tar .knsv members against the sidecar index.
+# Hashing runs in a process pool so several cores work on large trees; a single archive is
+# one sequential stream, so archives are spread over the pool as whole tasks.
+
+DEEP_HASH_CHUNKSIZE = 32  # tree files handed to a worker per round trip
 
 
+def _deep_hash(path: str) -> tuple[str | None, int, str | None]:
+    """Pool task: (digest, bytes read, error) of one stored file."""
+    h = _new_hasher()
+    n = 0
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                h.update(chunk)
+                n += len(chunk)
+    except FileNotFoundError:
+        return None, 0, None
+    except OSError as e:
+        return None, n, str(e)
+    return h.hexdigest(), n, None
+
+
+def _deep_check_zip(path: str) -> tuple[int, int, list[tuple[str, str]]]:
+    """Pool task: read every member of a zip (.knsv) so its CRC is checked.
+    Returns (members, uncompressed bytes, [(member, error)])."""
+    bad: list[tuple[str, str]] = []
+    members = total = 0
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                members += 1
+                try:
+                    with zf.open(info) as f:
+                        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                            total += len(chunk)
+                except (zipfile.BadZipFile, OSError, EOFError, ValueError) as e:  # CRC mismatch, truncation
+                    bad.append((info.filename, str(e)))
+    except (zipfile.BadZipFile, OSError) as e:
+        bad.append(("", str(e)))
+    return members, total, bad
+
+
+def _deep_check_tar_knsv(path: str) -> tuple[int, int, list[tuple[str, str]]]:
+    """Pool task: stream a tar .knsv to the end (the decompressor checks its own trailer) and
+    compare member sizes/CRCs with the sidecar index when it is valid for this archive."""
+    knsv = Path(path)
+    index = {m[0]: (m[1], m[2]) for m in load_knsv_index(knsv) or [] if m[2] is not None}
+    bad: list[tuple[str, str]] = []
+    members = total = 0
+    seen: set[str] = set()
+    try:
+        with tarfile.open(knsv, "r|*") as tf:
+            for member in tf:
+                if not member.isfile():
+                    continue
+                members += 1
+                crc = 0
+                f = tf.extractfile(member)
+                for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                    crc = zlib.crc32(chunk, crc)
+                    total += len(chunk)
+                seen.add(member.name)
+                if member.name in index and index[member.name] != (member.size, crc):
+                    bad.append((member.name, "CRC uyuşmuyor"))
+    except (tarfile.TarError, OSError, EOFError) as e:
+        bad.append(("", str(e)))
+        return members, total, bad
+    bad.extend((name, "eksik") for name in sorted(index.keys() - seen))
+    return members, total, bad
+
+
+def _open_archive_stream(path: Path):
+    """(tarfile in stream mode, decompressor process or None) for reading a <ts>.tar.* backup."""
+    if path.name.endswith(".tar.zst"):
+        try:
+            import compression.zstd  # noqa: F401  (Python 3.14+)
+            return tarfile.open(str(path), "r|zst"), None
+        except ImportError:
+            if not which("zstd"):
+                raise RuntimeError("tar.zst için 'zstd' komutu gerekli")
+            proc = subprocess.Popen(["zstd", "-q", "-dc", str(path)], stdout=subprocess.PIPE)
+            return tarfile.open(fileobj=proc.stdout, mode="r|"), proc
+    return tarfile.open(str(path), "r|*"), None
+
+
+def _deep_check_archive(path: str) -> tuple[int, int, list[str], list[str], str | None]:
+    """Pool task: stream one archive backup, hash every member and compare with the
+    manifest.jsonl stored in it. Returns (members, bytes, missing, corrupt, error)."""
+    digests: dict[str, str] = {}
+    manifest: dict[str, dict] = {}
+    total = 0
+    proc = None
+    try:
+        tf, proc = _open_archive_stream(Path(path))
+        with tf:
+            for member in tf:
+                if not member.isfile():
+                    continue
+                rel = member.name.split("/", 1)[1] if "/" in member.name else member.name
+                f = tf.extractfile(member)
+                if rel == MANIFEST_NAME:
+                    data = f.read()
+                    total += len(data)
+                    for line in data.decode("utf-8", "replace").splitlines():
+                        try:
+                            e = json.loads(line)
+                            manifest[e["path"]] = e
+                        except (ValueError, KeyError, TypeError):
+                            continue
+                    continue
+                h = _new_hasher()
+                for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                    h.update(chunk)
+                    total += len(chunk)
+                digests[rel] = h.hexdigest()
+    except (tarfile.TarError, OSError, EOFError, RuntimeError) as e:
+        return len(digests), total, [], [], str(e)
+    finally:
+        if proc is not None:
+            proc.stdout.close()
+            proc.wait()
+    if proc is not None and proc.returncode:
+        return len(digests), total, [], [], f"zstd çıkış kodu {proc.returncode}"
+    if not manifest:
+        return len(digests), total, [], [], f"arşivde {MANIFEST_NAME} yok"
+    missing = sorted(p for p in manifest if p not in digests)
+    corrupt = sorted(p for p, e in manifest.items()
+                     if p in digests and e.get("hash") and digests[p] != e["hash"])
+    return len(digests), total, missing, corrupt, None
+
+
+@dataclass
+class DeepVerifyResult:
+    name: str
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    missing: list[str] = field(default_factory=list)
+    corrupt: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.corrupt or self.errors)
+
+
+def _deep_verify_dir(pool, backup_dir: Path) -> DeepVerifyResult:
+    result = DeepVerifyResult(backup_dir.name)
+    knsv = _find_knsv(backup_dir)
+    knsv_job = None
+    if knsv:
+        check = {"zip": _deep_check_zip, "tar": _deep_check_tar_knsv}.get(knsv_format(knsv))
+        if check is None:
+            result.errors.append(f"{knsv.name}: arşiv biçimi tanınmadı (ne tar ne zip)")
+        else:
+            knsv_job = pool.submit(check, str(knsv))
+    manifest = load_manifest(backup_dir)
+    if not manifest:
+        result.errors.append(f"{MANIFEST_NAME} yok, dosya içerikleri doğrulanamadı")
+    paths = [p for p, e in manifest.items() if e.get("hash")]
+    for rel, (digest, n, err) in zip(paths, pool.map(_deep_hash, [str(backup_dir / p) for p in paths],
+                                                     chunksize=DEEP_HASH_CHUNKSIZE)):
+        result.bytes += n
+        if err:
+            result.errors.append(f"{rel}: {err}")
+        elif digest is None:
+            result.missing.append(rel)
+        else:
+            result.files += 1
+            if digest != manifest[rel]["hash"]:
+                result.corrupt.append(rel)
+    if knsv_job is not None:
+        members, n, bad = knsv_job.result()
+        result.files += members
+        result.bytes += n
+        result.corrupt.extend(f"{knsv.name}:{name}" if name else knsv.name for name, _ in bad)
+    return result
+
+
+def _deep_archive_result(path: Path, outcome) -> DeepVerifyResult:
+    members, n, missing, corrupt, err = outcome
+    result = DeepVerifyResult(path.name, files=members, bytes=n, missing=missing, corrupt=corrupt)
+    if err:
+        result.errors.append(err)
+    return result
+
+
+def _report_deep(result: DeepVerifyResult):
+    rate = result.bytes / result.seconds if result.seconds > 0 else 0
+    if RECORDS is not None:
+        for status, items in (("missing", result.missing), ("corrupt", result.corrupt), ("error", result.errors)):
+            for item in items:
+                RECORDS.emit("verify", "problem", backup=result.name, status=status, path=item)
+        RECORDS.emit("verify", "deep", backup=result.name, files=result.files, bytes=result.bytes,
+                     seconds=round(result.seconds, 3), bytes_per_sec=int(rate), ok=result.ok)
+        return
+    mark = "✓" if result.ok else "✗"
+    print(f"  {mark} {result.name}: {result.files} dosya, {_human_size(result.bytes)}, "
+          f"{result.seconds:.1f} sn ({_human_size(int(rate))}/s)")
+    for label, items in (("eksik", result.missing), ("bozuk", result.corrupt), ("hata", result.errors)):
+        for item in items[:20]:
+            print(f"      {label}: {item}")
+        if len(items) > 20:
+            print(f"      ... +{len(items) - 20} {label}")
+
+
+def verify_deep(target: str | None = None, tag: str | None = None, sweep_all: bool = False) -> int:
+    """Re-hash stored contents of one backup (or every backup with sweep_all).
+    Returns the number of backups with missing, corrupt or unreadable entries."""
+    from concurrent.futures import ProcessPoolExecutor
+    if sweep_all:
+        dirs = Catalog().backups()  # includes latest/
+        archives = sorted(p for p in BACKUP_ROOT.glob("*.tar.*")
+                          if p.is_file() and any(p.name.endswith("." + f) for f in ARCHIVE_FORMATS))
+    else:
+        selected = None
+        if target and any(target.endswith("." + f) for f in ARCHIVE_FORMATS):
+            selected = Path(target) if Path(target).is_file() else BACKUP_ROOT / target
+        else:
+            selected = _resolve_backup_selector(target, tag)
+        if not selected or not selected.exists():
+            _report_missing("verify", "[!] Verify için yedek bulunamadı.")
+            return 1
+        dirs, archives = ([selected], []) if selected.is_dir() else ([], [selected])
+    if not dirs and not archives:
+        _report_missing("verify", "[!] Doğrulanacak yedek yok.")
+        return 0
+
+    if RECORDS is None:
+        print(f"\n[Verify --deep] {len(dirs) + len(archives)} yedek, {os.cpu_count() or 1} işlem")
+    results: list[DeepVerifyResult] = []
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        # archives are single streams: start them all now, they overlap with the tree hashing
+        archive_jobs = [(p, pool.submit(_deep_check_archive, str(p)), time.monotonic()) for p in archives]
+        for d in dirs:
+            t0 = time.monotonic()
+            result = _deep_verify_dir(pool, d)
+            result.seconds = time.monotonic() - t0
+            _report_deep(result)
+            results.append(result)
+        for p, job, t0 in archive_jobs:
+            result = _deep_archive_result(p, job.result())
+            result.seconds = time.monotonic() - t0
+            _report_deep(result)
+            results.append(result)
+    elapsed = time.monotonic() - started
+
+    files = sum(r.files for r in results)
+    total = sum(r.bytes for r in results)
+    bad = sum(1 for r in results if not r.ok)
+    rate = total / elapsed if elapsed > 0 else 0
+    if RECORDS is not None:
+        RECORDS.emit("verify", "summary", backups=len(results), failed=bad, files=files, bytes=total,
+                     seconds=round(elapsed, 3), bytes_per_sec=int(rate), files_per_sec=int(files / elapsed) if elapsed > 0 else 0)
+    else:
+        mark = "[✓]" if not bad else "[!]"
+        print(f"\n{mark} {len(results)} yedek, {bad} sorunlu; {files} dosya, {_human_size(total)} "
+              f"{elapsed:.1f} sn içinde ({_human_size(int(rate))}/s, {files / elapsed if elapsed > 0 else 0:.0f} dosya/s)")
+    return bad
+
 def _resolve_backup_selector(sel: str | None, tag: str | None) -> Path | None:
     if sel is None and not tag:
         return pick_backup_dir()
@@ -1153,11 +3369,141 @@ def _resolve_backup_selector(sel: str | None, tag: str | None) -> Path | None:
     if tag:
         b = find_backup_by_tag(tag)
     elif sel:
-        cands = sorted([p for p in BACKUP_ROOT.iterdir() if p.is_dir() and p.name.startswith(sel)])
-        b = cands[-1] if cands else None
+        b = find_backup_by_prefix(sel)
     return b
 
 
+# --------------------- content compare ---------------------
+# compare reports changed files, not just added/removed names: tree files by size and the
+# manifest hash (only files without a usable manifest entry are hashed), .knsv members by
+# the CRC in the sidecar index. Changed KDE config files get a group/key level diff.
+
+INI_DIFF_MAX_BYTES = 1024 * 1024
+
+
+def parse_kde_ini(text: str) -> dict[str, dict[str, str]]:
+    """KConfig file -> {group: {key: value}}. Nested groups keep their bracketed form
+    ("Containments][1][Applets"), keys keep [$e]/locale suffixes; "" holds keys before any group."""
+    groups: dict[str, dict[str, str]] = {"": {}}
+    cur = groups[""]
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line[0] == "[" and line.endswith("]"):
+            cur = groups.setdefault(line[1:-1], {})
+        elif "=" in line:
+            key, value = line.split("=", 1)
+            cur[key.strip()] = value.strip()
+    if not groups[""]:
+        del groups[""]
+    return groups
+
+
+def _as_kde_ini(data: bytes | None) -> dict[str, dict[str, str]] | None:
+    """Parsed config when data looks like a KConfig/INI text file, else None."""
+    if data is None or len(data) > INI_DIFF_MAX_BYTES or b"\0" in data:
+        return None
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    for line in text.splitlines():
+        line = line.strip()
+        if line and line[0] not in "#;":
+            return parse_kde_ini(text) if line.startswith("[") else None
+    return None
+
+
+def ini_diff(a: dict[str, dict[str, str]], b: dict[str, dict[str, str]]) -> list[tuple]:
+    """(change, group, key, old, new) with change in +/-/~; key is None when a whole group
+    was added or removed."""
+    out: list[tuple] = []
+    for group in sorted(a.keys() | b.keys()):
+        if group not in b:
+            out.append(("-", group, None, None, None))
+        elif group not in a:
+            out.append(("+", group, None, None, None))
+        else:
+            ga, gb = a[group], b[group]
+            for key in sorted(ga.keys() | gb.keys()):
+                if key not in gb:
+                    out.append(("-", group, key, ga[key], None))
+                elif key not in ga:
+                    out.append(("+", group, key, None, gb[key]))
+                elif ga[key] != gb[key]:
+                    out.append(("~", group, key, ga[key], gb[key]))
+    return out
+
+
+def _tree_state(backup_dir: Path, sub: str) -> dict[str, list]:
+    """Path inside backup_dir/sub -> [size, hash]. Names come from a scan of the tree; the hash
+    comes from the manifest when its entry matches the stored size, else it is None."""
+    root = backup_dir / sub
+    if not root.exists():
+        return {}
+    manifest = load_manifest(backup_dir)
+    state: dict[str, list] = {}
+    for e in _scan_files(root):
+        rel = Path(e.path).relative_to(root).as_posix()
+        try:
+            size = e.stat().st_size
+        except OSError:
+            continue
+        entry = manifest.get(f"{sub}/{rel}")
+        state[rel] = [size, entry.get("hash") if entry and entry.get("size") == size else None]
+    return state
+
+
+def _changed_tree_files(a_root: Path, b_root: Path, a_state: dict[str, list], b_state: dict[str, list]) -> list[str]:
+    changed = []
+    for rel in sorted(a_state.keys() & b_state.keys()):
+        (a_size, a_hash), (b_size, b_hash) = a_state[rel], b_state[rel]
+        if a_size != b_size:
+            changed.append(rel)
+            continue
+        try:
+            a_hash = a_hash or _hash_file(a_root / rel)
+            b_hash = b_hash or _hash_file(b_root / rel)
+        except OSError:
+            continue
+        if a_hash != b_hash:
+            changed.append(rel)
+    return changed
+
+
+def _knsv_state(backup_dir: Path) -> dict[str, tuple]:
+    """Member name -> (size, crc32) from the .knsv sidecar index."""
+    k = _find_knsv(backup_dir)
+    if not k:
+        return {}
+    try:
+        return {m[0]: (m[1], m[2]) for m in knsv_index(k)}
+    except (OSError, zipfile.BadZipFile, tarfile.TarError, ValueError, EOFError):
+        return {}
+
+
+def _read_knsv_members(knsv: Path, names: set[str]) -> dict[str, bytes]:
+    """Contents of the given members; a tar stream stops once all of them were read."""
+    found: dict[str, bytes] = {}
+    try:
+        fmt = knsv_format(knsv)
+        if fmt == "zip":
+            with zipfile.ZipFile(knsv, "r") as zf:
+                for name in names:
+                    found[name] = zf.read(name)
+        elif fmt == "tar":
+            with tarfile.open(knsv, "r|*") as tf:
+                for member in tf:
+                    if member.name in names and member.isfile():
+                        found[member.name] = tf.extractfile(member).read()
+                        if len(found) == len(names):
+                            break
+    except (tarfile.TarError, zipfile.BadZipFile, KeyError, OSError, EOFError):
+        pass
+    return found
+
+
 def compare_backups(a: str, b: str):
     """Compare two backups by timestamp prefix or tag.
     Accepts values like 'latest', timestamp prefix, or 'tag:<name>'."""
@@ -1166,89 +3512,236 @@ def compare_backups(a: str, b: str):
             return BACKUP_ROOT / "latest"
         if x.startswith("tag:"):
             return find_backup_by_tag(x.split(":", 1)[1])
-        cands = sorted([p for p in BACKUP_ROOT.iterdir() if p.is_dir() and p.name.startswith(x)])
-        return cands[-1] if cands else None
+        return find_backup_by_prefix(x)
 
     a_dir = resolve(a)
     b_dir = resolve(b)
     if not a_dir or not a_dir.exists() or not b_dir or not b_dir.exists():
-        print("[!] Karşılaştırma için yedek(ler) bulunamadı.")
+        _report_missing("compare", "[!] Karşılaştırma için yedek(ler) bulunamadı.")
         return
 
     print(f"[i] Karşılaştırılıyor: {a_dir.name}  vs  {b_dir.name}")
+    if RECORDS is not None:
+        RECORDS.emit("compare", "backups", a=str(a_dir), b=str(b_dir))
+    else:
+        print("\n[Compare]")
+
+    def section(kind: str, label: str, a_items: set[str], b_items: set[str], limit: int, more: bool,
+                changed: list[str] | None = None):
+        """Report one section as soon as it is computed: every entry as a record in
+        --json/--ndjson mode, counts and the first `limit` entries as text otherwise."""
+        added = sorted(b_items - a_items)
+        removed = sorted(a_items - b_items)
+        groups = [("+", added), ("-", removed)] + ([("~", changed)] if changed is not None else [])
+        if RECORDS is not None:
+            for sign, items in groups:
+                for name in items:
+                    RECORDS.emit("compare", "entry", section=kind, name=name, change=sign)
+            counts = {"added": len(added), "removed": len(removed)}
+            if changed is not None:
+                counts["changed"] = len(changed)
+            RECORDS.emit("compare", "section", section=kind, **counts)
+            return
+        print(f"  • {label}: " + ", ".join(f"{sign}{len(items)}" for sign, items in groups))
+        for sign, items in groups:
+            if items:
+                tail = ((" ..." if len(items) > limit else ""),) if more else ()
+                print(f"    {sign} ", ", ".join(items[:limit]), *tail)
+
+    def key_changes(kind: str, changed: list[str], a_data: dict[str, bytes], b_data: dict[str, bytes], limit: int):
+        """Group/key level diff of every changed file that parses as a KDE config on both sides."""
+        for name in changed:
+            a_ini, b_ini = _as_kde_ini(a_data.get(name)), _as_kde_ini(b_data.get(name))
+            if a_ini is None or b_ini is None:
+                continue
+            diff = ini_diff(a_ini, b_ini)
+            if RECORDS is not None:
+                for sign, group, key, old, new in diff:
+                    RECORDS.emit("compare", "key", section=kind, name=name, group=group, key=key,
+                                 change=sign, old=old, new=new)
+                continue
+            print(f"    ~ {name}:")
+            for sign, group, key, old, new in diff[:limit]:
+                if key is None:
+                    print(f"        {sign} [{group}]")
+                elif sign == "~":
+                    print(f"        ~ [{group}] {key}: {old} -> {new}")
+                else:
+                    print(f"        {sign} [{group}] {key}={new if sign == '+' else old}")
+            if len(diff) > limit:
+                print(f"        ... +{len(diff) - limit}")
+
     # Packages
-    a_pkgs = set(_list_lines(a_dir / "packages.txt"))
-    b_pkgs = set(_list_lines(b_dir / "packages.txt"))
-    add_pkgs = sorted(b_pkgs - a_pkgs)
-    rm_pkgs = sorted(a_pkgs - b_pkgs)
+    section("packages", "Packages", set(_list_lines(a_dir / "packages.txt")),
+            set(_list_lines(b_dir / "packages.txt")), 15, True)
     # Flatpaks
-    a_fp = set(_list_lines(a_dir / "flatpaks.txt"))
-    b_fp = set(_list_lines(b_dir / "flatpaks.txt"))
-    add_fp = sorted(b_fp - a_fp)
-    rm_fp = sorted(a_fp - b_fp)
-    # Konsave archive contents (names only)
-    def list_archive_names(p: Path) -> set[str]:
-        k = _find_knsv(p)
-        names: set[str] = set()
-        if not k:
-            return names
+    section("flatpaks", "Flatpaks", set(read_flatpak_list(a_dir / "flatpaks.txt")),
+            set(read_flatpak_list(b_dir / "flatpaks.txt")), 15, True)
+
+    # Konsave archive contents (sidecar index: names, sizes, CRCs)
+    a_members, b_members = _knsv_state(a_dir), _knsv_state(b_dir)
+    changed = sorted(n for n in a_members.keys() & b_members.keys()
+                     if a_members[n][1] is not None and a_members[n] != b_members[n])
+    section("konsave", "Konsave archive entries", set(a_members), set(b_members), 20, False, changed)
+    if changed:
+        key_changes("konsave", changed, _read_knsv_members(_find_knsv(a_dir), set(changed)),
+                    _read_knsv_members(_find_knsv(b_dir), set(changed)), 20)
+
+    # Extra dirs: unchanged files are decided from manifests without reading them
+    for sub in ("extra-config", "extra-data"):
+        a_root, b_root = a_dir / sub, b_dir / sub
+        a_state, b_state = _tree_state(a_dir, sub), _tree_state(b_dir, sub)
+        changed = _changed_tree_files(a_root, b_root, a_state, b_state)
+        section(sub, f"{sub} files", set(a_state), set(b_state), 20, False, changed)
+
+        def read_small(root: Path) -> dict[str, bytes]:
+            data = {}
+            for rel in changed:
+                try:
+                    if (root / rel).stat().st_size <= INI_DIFF_MAX_BYTES:
+                        data[rel] = (root / rel).read_bytes()
+                except OSError:
+                    continue
+            return data
+        if changed:
+            key_changes(sub, changed, read_small(a_root), read_small(b_root), 20)
+
+
+# --------------------- history ---------------------
+
+def _history_stamp(backup_dir: Path) -> str:
+    """Changes when a backup is rewritten in place (quick backups update latest/)."""
+    parts = []
+    for name in (MANIFEST_NAME, "packages.txt", "flatpaks.txt"):
         try:
-            if tarfile.is_tarfile(k):
-                with tarfile.open(k, "r:*") as tf:
-                    names = set(tf.getnames())
-            elif zipfile.is_zipfile(k):
-                with zipfile.ZipFile(k, "r") as zf:
-                    names = set(zf.namelist())
-        except Exception:
-            pass
-        return names
-    a_kn = list_archive_names(a_dir)
-    b_kn = list_archive_names(b_dir)
-    add_kn = sorted(b_kn - a_kn)[:20]
-    rm_kn = sorted(a_kn - b_kn)[:20]
-    # Extra dirs
-    def scan_files(root: Path) -> set[str]:
-        out: set[str] = set()
-        if root.exists():
-            for f in root.rglob("*"):
-                if f.is_file():
-                    out.add(str(f.relative_to(root)))
-        return out
-    a_xc = scan_files(a_dir / "extra-config")
-    b_xc = scan_files(b_dir / "extra-config")
-    add_xc = sorted(b_xc - a_xc)[:20]
-    rm_xc = sorted(a_xc - b_xc)[:20]
-    a_xd = scan_files(a_dir / "extra-data")
-    b_xd = scan_files(b_dir / "extra-data")
-    add_xd = sorted(b_xd - a_xd)[:20]
-    rm_xd = sorted(a_xd - b_xd)[:20]
-
-    print("\n[Compare]")
-    print(f"  • Packages: +{len(add_pkgs)}, -{len(rm_pkgs)}")
-    if add_pkgs:
-        print("    + ", ", ".join(add_pkgs[:15]), (" ..." if len(add_pkgs) > 15 else ""))
-    if rm_pkgs:
-        print("    - ", ", ".join(rm_pkgs[:15]), (" ..." if len(rm_pkgs) > 15 else ""))
-    print(f"  • Flatpaks: +{len(add_fp)}, -{len(rm_fp)}")
-    if add_fp:
-        print("    + ", ", ".join(add_fp[:15]), (" ..." if len(add_fp) > 15 else ""))
-    if rm_fp:
-        print("    - ", ", ".join(rm_fp[:15]), (" ..." if len(rm_fp) > 15 else ""))
-    print(f"  • Konsave archive entries: +{len(b_kn - a_kn)}, -{len(a_kn - b_kn)}")
-    if add_kn:
-        print("    + ", ", ".join(add_kn))
-    if rm_kn:
-        print("    - ", ", ".join(rm_kn))
-    print(f"  • extra-config files: +{len(b_xc - a_xc)}, -{len(a_xc - b_xc)}")
-    if add_xc:
-        print("    + ", ", ".join(add_xc))
-    if rm_xc:
-        print("    - ", ", ".join(rm_xc))
-    print(f"  • extra-data files: +{len(b_xd - a_xd)}, -{len(a_xd - b_xd)}")
-    if add_xd:
-        print("    + ", ", ".join(add_xd))
-    if rm_xd:
-        print("    - ", ", ".join(rm_xd))
+            parts.append(str((backup_dir / name).stat().st_mtime_ns))
+        except OSError:
+            parts.append("-")
+    return ":".join(parts)
+
+
+def _history_config_path(path: str) -> bool:
+    return path.startswith("extra-config/") or "/.config/" in path
+
+
+def _history_snapshot(backup_dir: Path) -> tuple[list[tuple], list[tuple], list[str]]:
+    """([(path, hash, size)] of the extra-* trees, [(package, kind)], parts the backup has).
+    Hashes come from the manifest; files it does not cover (older backups) are hashed once here."""
+    files = []
+    kinds = [sub for sub in ("extra-config", "extra-data") if (backup_dir / sub).is_dir()]
+    kinds += [kind for name, kind in (("packages.txt", "package"), ("flatpaks.txt", "flatpak"))
+              if (backup_dir / name).exists()]
+    for sub in ("extra-config", "extra-data"):
+        for rel, (size, digest) in _tree_state(backup_dir, sub).items():
+            if digest is None:
+                try:
+                    digest = _hash_file(backup_dir / sub / rel)
+                except OSError:
+                    continue
+            files.append((f"{sub}/{rel}", digest, size))
+    packages = [(p, "package") for p in _list_lines(backup_dir / "packages.txt")]
+    packages += [(ref, "flatpak") for ref in read_flatpak_list(backup_dir / "flatpaks.txt")]
+    return files, packages, kinds
+
+
+def _timeline(names: list[str], states: dict[str, object]) -> list[tuple[str, str, object, object]]:
+    """(backup, change, old, new) for every backup whose state differs from the one before;
+    a backup missing from `states` means absent."""
+    out = []
+    prev = None
+    for name in names:
+        cur = states.get(name)
+        if cur != prev:
+            sign = "+" if prev is None else "-" if cur is None else "~"
+            out.append((name, sign, prev, cur))
+        prev = cur
+    return out
+
+
+def do_history(subject: str, group: str | None = None, key: str | None = None):
+    """When did a file (path in the backup or relative to $HOME), a config key of it, or a
+    package/flatpak change across all backups?"""
+    if not BACKUP_ROOT.exists():
+        _report_missing("history", f"[!] Yedek dizini bulunamadı: {BACKUP_ROOT}")
+        return
+    catalog = Catalog()
+    indexed = catalog.update_history()
+    if indexed and RECORDS is None:
+        print(f"[i] Geçmiş indeksine {indexed} yedek eklendi.")
+    started = time.monotonic()
+
+    rel = subject
+    home = str(Path.home())
+    if rel.startswith("~/"):
+        rel = rel[2:]
+    elif rel.startswith(home + "/"):
+        rel = rel[len(home) + 1:]
+    candidates = (rel, f"extra-config/{rel}", f"extra-data/{rel}")
+    found = catalog.history_rows("SELECT DISTINCT path FROM history_files WHERE path IN (?, ?, ?) ORDER BY path",
+                               candidates)
+    timelines: list[tuple[str, list]] = []
+    if found:
+        path = found[0][0]
+        sub = path.split("/", 1)[0]
+        if group is None:
+            names = catalog.history_backups(sub)
+            rows = catalog.history_rows("SELECT name, hash, size FROM history_files WHERE path = ?", (path,))
+            states = {name: (digest, size) for name, digest, size in rows}
+            timelines.append((path, _timeline(names, states)))
+        else:
+            sql = ("SELECT f.name, i.key, i.value FROM history_files f JOIN history_ini i ON i.hash = f.hash "
+                   "WHERE f.path = ? AND i.grp = ?")
+            params: tuple = (path, group)
+            if key is not None:
+                sql += " AND i.key = ?"
+                params += (key,)
+            names = catalog.history_backups(sub)
+            rows = catalog.history_rows(sql, params)
+            per_key: dict[str, dict[str, str]] = {}
+            for name, k, value in rows:
+                per_key.setdefault(k, {})[name] = value
+            for k in sorted(per_key):
+                timelines.append((f"{path} [{group}] {k}", _timeline(names, per_key[k])))
+    else:
+        names = catalog.history_backups()
+        rows = catalog.history_rows("SELECT name, kind FROM history_packages WHERE package = ?", (subject,))
+        by_kind: dict[str, dict[str, bool]] = {}
+        for name, kind in rows:
+            by_kind.setdefault(kind, {})[name] = True
+        for kind in sorted(by_kind):
+            timelines.append((f"{kind} {subject}", _timeline(catalog.history_backups(kind), by_kind[kind])))
+    elapsed_ms = (time.monotonic() - started) * 1000
+
+    if not timelines:
+        _report_missing("history", f"[!] '{subject}' için geçmiş bulunamadı (dosya yolu, ayar anahtarı ya da paket adı).")
+        return
+
+    def show(value) -> str | None:
+        if value is None or value is True:
+            return None
+        if isinstance(value, tuple):
+            digest, size = value
+            return f"{_human_size(size or 0)} {(digest or '')[:12]}"
+        return str(value)
+
+    for label, changes in timelines:
+        if RECORDS is not None:
+            for name, sign, old, new in changes:
+                RECORDS.emit("history", "change", subject=label, backup=name, change=sign,
+                             old=show(old), new=show(new))
+            continue
+        print(f"\n[History] {label}: {len(changes)} değişiklik")
+        for name, sign, old, new in changes:
+            if sign == "~":
+                detail = f"{show(old)} -> {show(new)}"
+            else:
+                detail = show(new if sign == "+" else old) or ""
+            print(f"  {name}  {sign} {detail}".rstrip())
+    if RECORDS is not None:
+        RECORDS.emit("history", "summary", subject=subject, backups=len(names),
+                     changes=sum(len(c) for _, c in timelines), ms=round(elapsed_ms, 1))
+    else:
+        print(f"\n[i] {len(names)} yedek tarandı, sorgu {elapsed_ms:.1f} ms.")
 
 
 def restore_import_bundle(bundle_path: Path, scope_override: set[str] | None = None,
@@ -1269,6 +3762,7 @@ def restore_import_bundle(bundle_path: Path, scope_override: set[str] | None = N
         else:
             print("[!] Bundle içinde .knsv bulunamadı.")
     # extra-*
+    manifest = load_manifest(bundle_path)
     if (bundle_path / "extra-config").exists() and "extra_config" in scope:
         if yes_extra_config is None:
             ans = input("Bundle extra-config kopyalansın mı? (E/h): ").strip().lower()
@@ -1276,14 +3770,12 @@ def restore_import_bundle(bundle_path: Path, scope_override: set[str] | None = N
         else:
             do_copy = yes_extra_config
         if do_copy:
-            for p in (bundle_path / "extra-config").rglob("*"):
-                if p.is_file():
-                    dest = Path.home() / p.relative_to(bundle_path / "extra-config")
-                    ensure_dir(dest.parent)
-                    try:
-                        shutil.copy2(p, dest)
-                    except OSError:
-                        pass
+            with CopyEngine() as engine:
+                for e in _scan_files(bundle_path / "extra-config"):
+                    rel = Path(e.path).relative_to(bundle_path / "extra-config")
+                    entry = manifest.get(f"extra-config/{rel.as_posix()}")
+                    engine.submit(partial(_restore_file, entry=entry), Path(e.path), Path.home() / rel)
+            engine.report()
     if (bundle_path / "extra-data").exists() and "extra_data" in scope:
         if yes_extra_data is None:
             ans = input("Bundle extra-data kopyalansın mı? (E/h): ").strip().lower()
@@ -1291,14 +3783,158 @@ def restore_import_bundle(bundle_path: Path, scope_override: set[str] | None = N
         else:
             do_copy = yes_extra_data
         if do_copy:
-            for p in (bundle_path / "extra-data").rglob("*"):
-                if p.is_file():
-                    dest = Path.home() / p.relative_to(bundle_path / "extra-data")
-                    ensure_dir(dest.parent)
-                    try:
-                        shutil.copy2(p, dest)
-                    except OSError:
-                        pass
+            with CopyEngine() as engine:
+                for e in _scan_files(bundle_path / "extra-data"):
+                    rel = Path(e.path).relative_to(bundle_path / "extra-data")
+                    entry = manifest.get(f"extra-data/{rel.as_posix()}")
+                    engine.submit(partial(_restore_file, entry=entry), Path(e.path), Path.home() / rel)
+            engine.report()
+
+# --------------------- archive output ---------------------
+
+ARCHIVE_FORMATS = ("tar.zst", "tar.xz", "tar.gz")
+
+
+class _SizedReader:
+    """File wrapper for tarfile that yields exactly `size` bytes while hashing them.
+    A file that shrinks while being archived is zero-padded (like GNU tar) so the
+    stream stays valid; growth beyond the header size is cut off."""
+
+    def __init__(self, f, size: int):
+        self.f = f
+        self.left = size
+        self.hasher = _new_hasher()
+        self.changed = False
+
+    def read(self, n: int = -1) -> bytes:
+        if n < 0 or n > self.left:
+            n = self.left
+        data = self.f.read(n)
+        if len(data) < n:
+            self.changed = True
+            data += b"\0" * (n - len(data))
+        self.left -= n
+        self.hasher.update(data)
+        return data
+
+
+class ArchiveSink:
+    """Streaming tar writer (constant memory) with gz/xz from tarfile and zstd from the stdlib
+    (Python 3.14+) or the `zstd` CLI through a pipe."""
+
+    def __init__(self, path: Path, fmt: str):
+        self.path = path
+        self.proc = None
+        self.errors: list[tuple[Path, OSError]] = []
+        self.changed: list[str] = []
+        self.entries: list[dict] = []
+        if fmt == "tar.gz":
+            self.tar = tarfile.open(str(path), "w|gz")
+        elif fmt == "tar.xz":
+            self.tar = tarfile.open(str(path), "w|xz")
+        else:
+            try:
+                import compression.zstd  # noqa: F401  (Python 3.14+)
+                self.tar = tarfile.open(str(path), "w|zst")
+            except ImportError:
+                if not which("zstd"):
+                    raise RuntimeError("tar.zst için 'zstd' komutu gerekli")
+                self.proc = subprocess.Popen(["zstd", "-q", "-T0", "-f", "-o", str(path)], stdin=subprocess.PIPE)
+                self.tar = tarfile.open(fileobj=self.proc.stdin, mode="w|")
+
+    def add_bytes(self, arcname: str, data: bytes):
+        info = tarfile.TarInfo(arcname)
+        info.size = len(data)
+        info.mtime = int(datetime.now().timestamp())
+        info.mode = 0o644
+        self.tar.addfile(info, io.BytesIO(data))
+
+    def add_file(self, arcname: str, src: Path, record: bool = False):
+        try:
+            f = open(src, "rb")
+            # fstat of the open file: symlinked files are stored with their content, like copy2
+            info = self.tar.gettarinfo(arcname=arcname, fileobj=f)
+            st = os.fstat(f.fileno())
+        except OSError as e:
+            # Nothing written for this member yet, so skipping keeps the stream valid
+            self.errors.append((src, e))
+            return
+        with f:
+            reader = _SizedReader(f, info.size)
+            self.tar.addfile(info, reader)
+        if reader.changed:
+            self.changed.append(arcname)
+        if record:
+            self.entries.append(_manifest_entry(arcname.split("/", 1)[1], reader.hasher.hexdigest(), st))
+
+    def close(self):
+        self.tar.close()
+        if self.proc is not None:
+            self.proc.stdin.close()
+            if self.proc.wait() != 0:
+                raise RuntimeError(f"zstd çıkış kodu {self.proc.returncode}")
+
+
+def _archive_members(ts: str, home: Path, knsv: Path, inventory: PackageInventory):
+    """Generator pipeline feeding ArchiveSink: (arcname, bytes | Path, is_tree_file)."""
+    yield f"{ts}/{knsv.name}", knsv, False
+    for name, content in inventory.files().items():
+        yield f"{ts}/{name}", content.encode(), False
+    for src, dest, target in _iter_backup_files(home):
+        yield f"{ts}/{dest.as_posix()}", (src, target), True
+
+
+def _backup_to_archive(ts: str, profile: str, fmt: str, tags: list[str] | None, scope_override: set[str] | None):
+    """Full backup streamed into one kde-backups/<ts>.<fmt> file, without a loose staging copy."""
+    import tempfile
+    out = BACKUP_ROOT / f"{ts}.{fmt}"
+    home = Path.home()
+    print("[i] Paket envanteri alınıyor (AUR, Flatpak, vs.)...")
+    inventory = PackageInventory.collect()
+    with tempfile.TemporaryDirectory(prefix="kde-backup-") as tmp:
+        print("[i] KDE ayarları export ediliyor (konsave)...")
+        knsv = konsave_save_and_export(profile, Path(tmp), archive_name=profile)
+        try:
+            sink = ArchiveSink(out, fmt)
+        except RuntimeError as e:
+            print(f"[!] {e}")
+            return
+        stored: set[Path] = set()
+        print(f"[i] Arşiv yazılıyor: {out.name}")
+        try:
+            for arcname, payload, is_tree_file in _archive_members(ts, home, knsv, inventory):
+                if isinstance(payload, bytes):
+                    sink.add_bytes(arcname, payload)
+                elif is_tree_file:
+                    src, target = payload
+                    before = len(sink.errors)
+                    sink.add_file(arcname, src, record=True)
+                    if len(sink.errors) == before:
+                        stored.add(target)
+                else:
+                    sink.add_file(arcname, payload)
+            saved_extra, saved_extra_data = _saved_targets(home, stored)
+            meta = _backup_meta(ts, inventory.pm, profile, tags, scope_override, knsv.name, saved_extra,
+                                saved_extra_data, archive_format=fmt)
+            manifest = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in sink.entries)
+            sink.add_bytes(f"{ts}/{MANIFEST_NAME}", manifest.encode())
+            sink.add_bytes(f"{ts}/meta.json", json.dumps(meta, indent=2, ensure_ascii=False).encode())
+            sink.close()
+        except BaseException:
+            # Never leave a truncated archive that looks like a finished backup
+            try:
+                out.unlink()
+            except OSError:
+                pass
+            raise
+    for src, e in sink.errors:
+        print(f"[!] Arşive eklenemedi: {src}: {e}")
+    if sink.changed:
+        print(f"[!] Arşivlenirken değişen {len(sink.changed)} dosya (boyut farkı): {', '.join(sink.changed[:5])}")
+    print("\n[✓] Yedek tamamlandı:")
+    print(f"  Arşiv: {out} ({_human_size(out.stat().st_size)})")
+    print(f"  Profil: {profile}")
+
 
 # --------------------- UI ---------------------
 
@@ -1397,15 +4033,41 @@ if __name__ == "__main__":
                         return val
                 return None
 
+            mode_val = _pop_opt("--snapshot-mode")
+            if mode_val:
+                if mode_val in SNAPSHOT_MODES:
+                    SNAPSHOT_MODE = mode_val
+                else:
+                    print(f"[!] Geçersiz --snapshot-mode: {mode_val} (geçerli: {', '.join(SNAPSHOT_MODES)})")
+                    sys.exit(2)
             scope_val = _pop_opt("--scope")
             if scope_val:
                 scope_set = parse_scope(scope_val)
             tags_val = _pop_opt("--tags")
             if tags_val:
                 tags_list = [t.strip() for t in tags_val.split(",") if t.strip()]
+            archive_fmt = _pop_opt("--format")
+            if archive_fmt and archive_fmt not in ARCHIVE_FORMATS:
+                print(f"[!] Geçersiz --format: {archive_fmt} (geçerli: {', '.join(ARCHIVE_FORMATS)})")
+                sys.exit(2)
+            jobs_val = _pop_opt("--jobs")
+            if jobs_val:
+                try:
+                    COPY_JOBS = max(1, int(jobs_val))
+                except ValueError:
+                    print(f"[!] Geçersiz --jobs değeri: {jobs_val}")
+                    sys.exit(2)
             tag_val = _pop_opt("--tag")
             if tag_val:
                 tag_filter = tag_val
+            for fmt_flag in ("--json", "--ndjson"):
+                if fmt_flag in args:
+                    args.remove(fmt_flag)
+                    RECORDS = RecordStream(fmt_flag[2:], sys.stdout)
+                    atexit.register(RECORDS.close)
+            if RECORDS is not None:
+                # stdout carries only the records; progress and prompts go to stderr
+                sys.stdout = sys.stderr
 
             # yes flags for non-interactive extra-* copy
             yes_extra_config = None
@@ -1431,13 +4093,30 @@ if __name__ == "__main__":
             if len(args) > 1 and not args[1].startswith("--"):
                 ts_hint = args[1]
 
-            if cmd in {"--quick", "quick"}:
+            if cmd in {"--watch", "watch"}:
+                do_watch()
+                sys.exit(0)
+            elif cmd in {"--reindex", "reindex"}:
+                do_reindex()
+                sys.exit(0)
+            elif cmd in {"--history", "history"}:
+                if len(args) >= 2:
+                    do_history(args[1], *args[2:4])
+                else:
+                    print("Kullanım: history <dosya-yolu|paket> [grup [anahtar]]  (ör: history .config/kdeglobals General ColorScheme)")
+                sys.exit(0)
+            elif cmd in {"--quick", "quick"}:
                 do_quick_backup()
                 sys.exit(0)
             elif cmd in {"--full", "full"}:
-                do_backup(tags=tags_list, scope_override=scope_set)
+                do_backup(tags=tags_list, scope_override=scope_set, archive_format=archive_fmt)
                 sys.exit(0)
             elif cmd in {"--verify", "verify"}:
+                if "--deep" in args:
+                    args.remove("--deep")
+                    sweep = "--all" in args
+                    target = args[1] if len(args) > 1 and not args[1].startswith("--") else None
+                    sys.exit(1 if verify_deep(target=target, tag=tag_filter, sweep_all=sweep) else 0)
                 verify_backup(target=ts_hint, tag=tag_filter)
                 sys.exit(0)
             elif cmd in {"--restore", "restore"}:
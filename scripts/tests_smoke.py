@@ -5,12 +5,15 @@ Creates temporary backup structures under ./kde-backups/ and exercises functions
 """
 
 from pathlib import Path
+import io
 import json
+import os
 import shutil
 import shutil as sys_shutil
 import time
 import zipfile
 
+import kde_backup_restore
 from kde_backup_restore import (
     BACKUP_ROOT,
     write_text,
@@ -20,6 +23,27 @@ from kde_backup_restore import (
     compare_backups,
     restore_import_bundle,
     verify_backup,
+    SnapshotWriter,
+    ObjectStore,
+    OBJECTS_DIRNAME,
+    MANIFEST_NAME,
+    read_pacman_explicit,
+    read_dpkg_manual,
+    read_rpmdb_names,
+    read_flatpak_apps,
+    flatpak_install_commands,
+    parse_flatpak_lines,
+    StatIndex,
+    CopyEngine,
+    find_backup_by_tag,
+    find_backup_by_prefix,
+    RestorePlan,
+    parse_kde_ini,
+    ini_diff,
+    do_history,
+    RecordStream,
+    do_restore,
+    Catalog,
 )
 
 
@@ -126,6 +150,235 @@ def make_backup_with_valid_knsv(ts: str):
     return b
 
 
+def smoke_object_store():
+    """Two snapshots of the same file must share one blob in the object store."""
+    src_root = BACKUP_ROOT / "_smoke_src"
+    ensure_dir(src_root)
+    src = src_root / "kwinrc"
+    write_text(src, "[Windows]\nBorderlessMaximizedWindows=true\n")
+    digests = set()
+    for name in ("_smoke_cas_a", "_smoke_cas_b"):
+        snap = BACKUP_ROOT / name
+        writer = SnapshotWriter(snap, mode="objects")
+        writer.add(src, snap / "extra-config/.config/kwinrc")
+        writer.write_manifest()
+        entry = json.loads((snap / MANIFEST_NAME).read_text().splitlines()[0])
+        digests.add(entry["hash"])
+    assert len(digests) == 1, digests
+    blob = ObjectStore(BACKUP_ROOT / OBJECTS_DIRNAME).blob_path(digests.pop())
+    assert blob.stat().st_nlink == 3, blob.stat().st_nlink
+    for name in ("_smoke_src", "_smoke_cas_a", "_smoke_cas_b"):
+        shutil.rmtree(BACKUP_ROOT / name, ignore_errors=True)
+    assert ObjectStore(BACKUP_ROOT / OBJECTS_DIRNAME).prune() >= 1
+    assert not blob.exists()
+
+
+def smoke_snapshot_metadata():
+    """Identical files with different mtimes share a blob but are restored with their own mtimes."""
+    src_root = BACKUP_ROOT / "_smoke_src"
+    home = BACKUP_ROOT / "_smoke_home"
+    snap = BACKUP_ROOT / "_smoke_meta"
+    ensure_dir(src_root)
+    writer = SnapshotWriter(snap, mode="objects")
+    for name, mtime in (("a.txt", 1000000), ("b.txt", 2000000)):
+        write_text(src_root / name, "same content\n")
+        os.utime(src_root / name, (mtime, mtime))
+        writer.add(src_root / name, snap / "extra-data/docs" / name)
+    writer.write_manifest()
+    write_text(snap / "meta.json", json.dumps({"created": snap.name, "scope": {"extra_data": True}}))
+    saved_home, saved_cache = os.environ.get("HOME"), os.environ.get("XDG_CACHE_HOME")
+    os.environ["HOME"] = str(home)
+    os.environ["XDG_CACHE_HOME"] = str(home / ".cache")
+    try:
+        do_restore(selected_backup=snap, scope_override={"extra_data"}, yes_extra_data=True)
+        for name, mtime in (("a.txt", 1000000), ("b.txt", 2000000)):
+            st = (home / "docs" / name).stat()
+            assert st.st_mtime == mtime, (name, st.st_mtime)
+            assert st.st_nlink == 1, (name, st.st_nlink)
+    finally:
+        for key, val in (("HOME", saved_home), ("XDG_CACHE_HOME", saved_cache)):
+            if val is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = val
+        for path in (src_root, home, snap):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def smoke_catalog(b1: Path):
+    """Catalog selectors, including backup dirs added and removed by hand."""
+    assert find_backup_by_prefix(b1.name) == b1
+    gone = BACKUP_ROOT / "20000101-000000"
+    ensure_dir(gone)
+    write_text(gone / "meta.json", json.dumps({"created": gone.name, "tags": ["smoke-gone"]}))
+    assert find_backup_by_tag("smoke-gone") == gone
+    # tags edited in an existing meta.json reach the catalog
+    write_text(gone / "meta.json", json.dumps({"created": gone.name, "tags": ["smoke-edited"]}))
+    assert find_backup_by_tag("smoke-edited") == gone
+    assert find_backup_by_tag("smoke-gone") is None
+    # re-recording a backup keeps its history rows (no delete + insert cascade)
+    catalog = Catalog()
+    catalog.update_history()
+    catalog.record(b1)
+    assert catalog.update_history() == 0
+    shutil.rmtree(gone)
+    assert find_backup_by_tag("smoke-gone") is None
+    assert find_backup_by_prefix("20000101") is None
+
+
+def smoke_plan_cache(b: Path):
+    """A cached restore plan is reused, and rebuilt when the backup or the package db changes."""
+    cache = BACKUP_ROOT / "_smoke_cache"
+    db = cache / "status"
+    ensure_dir(cache)
+    write_text(db, "htop\n")
+    saved_env, saved_sources = os.environ.get("XDG_CACHE_HOME"), kde_backup_restore._package_db_sources
+    os.environ["XDG_CACHE_HOME"] = str(cache)
+    kde_backup_restore._package_db_sources = lambda pm, root=Path("/"): [db]
+    try:
+        scope = {"packages", "extra_config"}
+        assert not RestorePlan.build(b, scope).cached
+        assert RestorePlan.build(b, scope).cached
+        os.utime(db, ns=(1, 1))  # package installed/removed since the plan was built
+        assert not RestorePlan.build(b, scope).cached
+        os.utime(b / "packages.txt")
+        assert not RestorePlan.build(b, scope).cached
+        plan = RestorePlan.build(b, scope)
+        assert plan.cached
+        plan.invalidate()
+        assert not RestorePlan.build(b, scope).cached
+    finally:
+        kde_backup_restore._package_db_sources = saved_sources
+        if saved_env is None:
+            os.environ.pop("XDG_CACHE_HOME", None)
+        else:
+            os.environ["XDG_CACHE_HOME"] = saved_env
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+def smoke_ini_diff():
+    """KDE config key-level diff: nested groups, [$e] keys, group and key add/remove/change."""
+    a = parse_kde_ini(
+        "# comment\n[General]\nColorScheme=Breeze\nfont=Noto Sans,10\n\n"
+        "[Containments][1][Applets]\nplugin=org.kde.panel\n[Old]\nx=1\n"
+    )
+    b = parse_kde_ini(
+        "[General]\nColorScheme = BreezeDark\nfont=Noto Sans,10\nHome[$e]=$HOME/x\n"
+        "[Containments][1][Applets]\nplugin=org.kde.panel\n[New]\ny=2\n"
+    )
+    assert a["Containments][1][Applets"] == {"plugin": "org.kde.panel"}
+    assert ini_diff(a, b) == [
+        ("~", "General", "ColorScheme", "Breeze", "BreezeDark"),
+        ("+", "General", "Home[$e]", None, "$HOME/x"),
+        ("+", "New", None, None, None),
+        ("-", "Old", None, None, None),
+    ], ini_diff(a, b)
+    assert ini_diff(a, a) == []
+
+
+def smoke_history(b1: Path):
+    """history orders snapshots by creation time: latest/ (a copy of an older backup) must not
+    show up as a revert after a newer full backup."""
+    time.sleep(1)
+    b_new = make_backup(time.strftime("%Y%m%d-%H%M%S"))
+    write_text(b_new / "extra-config/.config/kdeglobals", "[General]\nColorScheme=BreezeDark\n")
+    out = io.StringIO()
+    kde_backup_restore.RECORDS = RecordStream("ndjson", out)
+    try:
+        do_history(".config/kdeglobals", "General", "ColorScheme")
+    finally:
+        kde_backup_restore.RECORDS = None
+    changes = [(r["backup"], r["change"], r["new"]) for r in map(json.loads, out.getvalue().splitlines())
+               if r["type"] == "change"]
+    assert changes == [(b1.name, "+", "Breeze"), (b_new.name, "~", "BreezeDark")], changes
+    shutil.rmtree(b_new, ignore_errors=True)
+
+
+def smoke_stat_index():
+    """Quick backup index: unchanged files are skipped, vanished files are deleted from latest/."""
+    src = BACKUP_ROOT / "_smoke_statsrc"
+    root = BACKUP_ROOT / "_smoke_statlatest"
+    ensure_dir(src)
+    write_text(src / "a.txt", "one\n")
+    write_text(src / "b.txt", "two\n")
+
+    def sync() -> StatIndex:
+        index = StatIndex(root)
+        with CopyEngine() as engine:
+            index.sync_tree(src, "extra-data/d", engine)
+        index.finish()
+        return index
+
+    sync()
+    assert (root / "extra-data/d/b.txt").read_text() == "two\n"
+    assert sync().skipped == 2
+    (src / "b.txt").unlink()
+    write_text(src / "a.txt", "one, longer\n")
+    index = sync()
+    assert index.skipped == 0, index.skipped
+    assert (root / "extra-data/d/a.txt").read_text() == "one, longer\n"
+    assert not (root / "extra-data/d/b.txt").exists()
+    manifest = [json.loads(line)["path"] for line in (root / MANIFEST_NAME).read_text().splitlines()]
+    assert manifest == ["extra-data/d/a.txt"], manifest
+    shutil.rmtree(src, ignore_errors=True)
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def smoke_pkg_db_readers():
+    """Native package db readers against fixture database directories."""
+    import sqlite3
+
+    root = BACKUP_ROOT / "_smoke_pkgdb"
+    local = root / "var/lib/pacman/local"
+    for d in (local / "htop-3.3.0-1", local / "ncurses-6.5-3", root / "var/lib/dpkg", root / "var/lib/apt"):
+        ensure_dir(d)
+    write_text(local / "htop-3.3.0-1/desc", "%NAME%\nhtop\n\n%VERSION%\n3.3.0-1\n\n")
+    write_text(local / "ncurses-6.5-3/desc", "%NAME%\nncurses\n\n%REASON%\n1\n\n")
+    write_text(local / "ALPM_DB_VERSION", "9\n")
+    assert read_pacman_explicit(root) == ["htop"]
+
+    write_text(
+        root / "var/lib/dpkg/status",
+        "Package: htop\nStatus: install ok installed\nArchitecture: amd64\n\n"
+        "Package: libc6\nStatus: install ok installed\nArchitecture: amd64\n\n"
+        "Package: libc6\nStatus: install ok installed\nArchitecture: i386\n\n"
+        "Package: tzdata\nStatus: install ok installed\nArchitecture: all\n\n"
+        "Package: gone\nStatus: deinstall ok config-files\nArchitecture: amd64\n",
+    )
+    write_text(
+        root / "var/lib/apt/extended_states",
+        "Package: libc6\nArchitecture: amd64\nAuto-Installed: 1\n\n"
+        "Package: tzdata\nArchitecture: amd64\nAuto-Installed: 1\n",
+    )
+    assert read_dpkg_manual(root) == ["htop", "libc6:i386"], read_dpkg_manual(root)
+
+    rpmdb = root / "var/lib/rpm/rpmdb.sqlite"
+    ensure_dir(rpmdb.parent)
+    con = sqlite3.connect(rpmdb)
+    con.execute("CREATE TABLE Name (key TEXT NOT NULL, hnum INTEGER NOT NULL, idx INTEGER NOT NULL)")
+    con.executemany("INSERT INTO Name VALUES (?, ?, 0)", [("htop", 1), ("bash", 2), ("bash", 3)])
+    con.commit()
+    con.close()
+    assert read_rpmdb_names(root) == ["bash", "htop"]
+
+    assert read_pacman_explicit(root / "missing") is None
+
+    # flatpak deploy file: GVariant (ssasta{sv}) = origin, commit, subpaths, size (BE), metadata
+    deploy = b"flathub\0" + b"c" * 64 + b"\0"
+    deploy += b"\0" * (-len(deploy) % 8) + (123456).to_bytes(8, "big") + bytes([73, 73, 8])
+    commit_dir = root / "flatpak/app/org.kde.kate/x86_64/stable/ccc"
+    ensure_dir(commit_dir)
+    (commit_dir / "deploy").write_bytes(deploy)
+    (commit_dir.parent / "active").symlink_to("ccc")
+    ensure_dir(root / "flatpak/app/org.kde.gone/x86_64/stable")  # no active deployment
+    apps = read_flatpak_apps([("user", root / "flatpak")])
+    assert [(a.ref, a.origin, a.installed_size) for a in apps] == [("org.kde.kate/x86_64/stable", "flathub", 123456)], apps
+    refs = parse_flatpak_lines([apps[0].line(), "org.example.Old/x86_64/stable"])
+    assert refs == {"org.kde.kate/x86_64/stable": "flathub", "org.example.Old/x86_64/stable": ""}
+    assert len(flatpak_install_commands(refs)) == 2
+    shutil.rmtree(root, ignore_errors=True)
+
+
 def main():
     print("[smoke] preparing test backups under:", BACKUP_ROOT)
     ensure_dir(BACKUP_ROOT)
@@ -167,6 +420,30 @@ def main():
     print("\n[smoke] Testing verify_backup on 'latest'")
     verify_backup(target="latest")
 
+    print("\n[smoke] Testing backup catalog selectors")
+    smoke_catalog(b1)
+
+    print("\n[smoke] Testing restore plan cache")
+    smoke_plan_cache(b1)
+
+    print("\n[smoke] Testing KDE config key diff")
+    smoke_ini_diff()
+
+    print("\n[smoke] Testing history order with an older latest/")
+    smoke_history(b1)
+
+    print("\n[smoke] Testing content-addressed object store")
+    smoke_object_store()
+
+    print("\n[smoke] Testing restore of shared-blob file metadata")
+    smoke_snapshot_metadata()
+
+    print("\n[smoke] Testing quick backup stat index")
+    smoke_stat_index()
+
+    print("\n[smoke] Testing native package database readers")
+    smoke_pkg_db_readers()
+
     print("\n[smoke] OK")
 
 